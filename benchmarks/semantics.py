@@ -0,0 +1,71 @@
+"""Benchmark of the grounded-semantics solver on random AFs of increasing size.
+
+Usage (from the repository root):
+    python benchmarks/semantics.py [--sizes 100 1000 5000] [--degree 4]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from argumentation.semantics import BitsetAF
+
+
+def random_attacks(n: int, degree: float, rng: np.random.Generator):
+    """Random AF where each argument attacks `degree` other arguments on average."""
+    n_attacks = int(n * degree)
+    return rng.integers(0, n, n_attacks), rng.integers(0, n, n_attacks)
+
+
+def dense_grounded(mat: np.ndarray) -> np.ndarray:
+    """Reference fixpoint on a dense Boolean matrix."""
+    ext = np.zeros(len(mat), dtype=bool)
+    while True:
+        out = mat[ext].any(axis=0)
+        new_ext = ~np.any(mat & ~out[:, None], axis=0)
+        if np.array_equal(new_ext, ext):
+            return ext
+        ext = new_ext
+
+
+def timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 2000, 5000, 10000, 20000])
+    parser.add_argument("--degree", type=float, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dense-limit", type=int, default=5000, help="largest size for the dense reference")
+    parser.add_argument("--seed", type=int, default=0)
+    opts = parser.parse_args()
+
+    rng = np.random.default_rng(opts.seed)
+    print("{:>8} {:>10} {:>12} {:>12} {:>10} {:>12}".format("args", "attacks", "build (ms)", "bitset (ms)", "|ext|", "dense (ms)"))
+    for n in opts.sizes:
+        attackers, attacked = random_attacks(n, opts.degree, rng)
+        build = timeit(lambda: BitsetAF.from_edges(n, attackers, attacked), opts.repeat)
+        af = BitsetAF.from_edges(n, attackers, attacked)
+        solve = timeit(af.grounded, opts.repeat)
+        ext = af.grounded()
+        dense = "-"
+        if n <= opts.dense_limit:
+            mat = np.zeros((n, n), dtype=bool)
+            mat[attackers, attacked] = True
+            assert np.array_equal(dense_grounded(mat), ext)
+            dense = "{:.2f}".format(1e3 * timeit(lambda: dense_grounded(mat), opts.repeat))
+        print("{:>8} {:>10} {:>12.2f} {:>12.2f} {:>10} {:>12}".format(n, len(attackers), 1e3 * build, 1e3 * solve, ext.sum(), dense))
+
+
+if __name__ == "__main__":
+    main()
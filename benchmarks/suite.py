@@ -0,0 +1,302 @@
+"""Micro- and macro-benchmarks of ORLA, parameterised over the number of arguments and the map size.
+
+Results are written as JSON (with the commit and library versions), so that runs on different commits can be compared.
+
+Usage (from the repository root):
+    python benchmarks/suite.py [--args 8 39 200 1000] [--map-sizes 8 16 32] [--only decode] [--output results.json]
+    python benchmarks/suite.py --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agents.orla import ORLABaseline
+from agents.plackett_luce import PlackettLuce
+from argumentation import utils as argm
+from argumentation.classes import ArgumentationFramework, CompiledVAF, ValuebasedArgumentationFramework
+from environments.environment import Environment
+from environments.foggy_frozen_lake.FFL import FFL
+from environments.foggy_frozen_lake.utils import argument_actions
+from utils import Mode
+
+# Number of actions promoted by the synthetic arguments.
+N_ACTIONS = 4
+
+
+def synthetic_arg_actions(n: int) -> Dict[str, int]:
+    """n arguments, each one promoting one of N_ACTIONS actions."""
+    return {"a{}".format(i): i % N_ACTIONS for i in range(n)}
+
+
+def random_ranking(args: argm.Arguments, mode: Mode, rng: random.Random) -> argm.Ranking:
+    args = rng.sample(args, len(args))
+    if mode == Mode.STRICT:
+        return [[arg] for arg in args]
+    ranking = []
+    while args:
+        size = rng.randint(1, 3)
+        ranking.append(args[:size])
+        args = args[size:]
+    return ranking
+
+
+class SyntheticEnvironment(Environment):
+    """Environment whose observations are directly the lists of valid arguments."""
+    def get_premises(self, obs):
+        return obs
+
+    def get_arguments(self, premises):
+        return premises
+
+    def update_memory(self, obs, act):
+        pass
+
+    def reset_memory(self):
+        pass
+
+
+def net_parameters(n: int, mode: Mode) -> int:
+    """Parameters of the network of ORLA for n arguments (it grows as n^4)."""
+    outputs = n if mode == Mode.STRICT else 2*n
+    return n*n*n*n + n*n + n*n*outputs + outputs
+
+
+# Each benchmark builds its inputs for some parameters and returns the function to time (or a reason to skip them).
+# Inputs that cannot be reused across calls are built by a setup function: the benchmark then returns the pair
+# (setup, fn), and only fn(setup()) is timed.
+
+def bench_ranking_to_matrix(n_args: int, opts, rng: random.Random):
+    args = list(synthetic_arg_actions(n_args))
+    ranking = random_ranking(args, Mode.STRICT, rng)
+    return lambda: argm.ranking_to_matrix(ranking, args, True)
+
+
+def bench_af_construction(n_args: int, opts, rng: random.Random):
+    arg_actions = synthetic_arg_actions(n_args)
+    args = list(arg_actions)
+    attacks = list(argm.construct_all_attacks(arg_actions))
+    return lambda: ArgumentationFramework(args, attacks)
+
+
+def bench_update_vaf(n_args: int, opts, rng: random.Random):
+    arg_actions = synthetic_arg_actions(n_args)
+    args = list(arg_actions)
+    vaf = ValuebasedArgumentationFramework(args, list(argm.construct_all_attacks(arg_actions)), update_on_init=False)
+    ranking = random_ranking(args, Mode.STRICT, rng)
+    return lambda: vaf.reorder(ranking)
+
+
+def bench_select_action(n_args: int, opts, rng: random.Random):
+    arg_actions = synthetic_arg_actions(n_args)
+    args = list(arg_actions)
+    env = SyntheticEnvironment(arg_actions, None)
+    env._vaf.reorder(random_ranking(args, Mode.STRICT, rng))
+    engine = CompiledVAF(env._vaf)
+    observations = [rng.sample(args, rng.randint(1, n_args)) for _ in range(64)]
+    cycle = iter(range(10**12))
+    return lambda: env.select_action(engine, observations[next(cycle) % len(observations)])
+
+
+def _orla(n_args: int, mode: Mode, architecture: str, opts):
+    """The agent to benchmark, or the reason to skip it."""
+    if architecture == "mlp" and net_parameters(n_args, mode) > opts.max_params:
+        return "network larger than --max-params"
+    if architecture == "pointer" and n_args > opts.max_pointer_args:
+        return "more arguments than --max-pointer-args"
+    args = list(synthetic_arg_actions(n_args))
+    return ORLABaseline(args, 1e-3, 1e-3, torch.device("cpu"), mode, architecture)
+
+
+def bench_decode(mode: Mode, architecture: str = "mlp"):
+    def bench(n_args: int, opts, rng: random.Random):
+        orla = _orla(n_args, mode, architecture, opts)
+        if isinstance(orla, str):
+            return orla
+        return lambda: orla.decode_ranking()
+    return bench
+
+
+def bench_decode_greedy(cached: bool):
+    """The greedy ranking of a strict policy, through the cache of `ORLA.decode_ranking` or decoded every time."""
+    def bench(n_args: int, opts, rng: random.Random):
+        orla = _orla(n_args, Mode.STRICT, "mlp", opts)
+        if isinstance(orla, str):
+            return orla
+        if cached:
+            return lambda: orla.decode_ranking(True)
+        return lambda: orla.decode_rankings(1, greedy=True)
+    return bench
+
+
+def bench_learn(mode: Mode, architecture: str = "mlp"):
+    def bench(n_args: int, opts, rng: random.Random):
+        orla = _orla(n_args, mode, architecture, opts)
+        if isinstance(orla, str):
+            return orla
+        def decode():
+            # The probabilities carry the graph of the forward passes, so each update needs a fresh batch.
+            rankings, probs, state = orla.decode_rankings(opts.batch_size, return_state=True)
+            return rankings, probs, [rng.random() for _ in rankings], state
+        return decode, lambda batch: orla.learn(*batch)
+    return bench
+
+
+def bench_decode_plackett_luce(n_args: int, opts, rng: random.Random):
+    """A batch of strict rankings from the Plackett-Luce policy (one draw, no network call per position)."""
+    orla = PlackettLuce(list(synthetic_arg_actions(n_args)), 1e-3, 1e-3, torch.device("cpu"))
+    return lambda: orla.decode_rankings(opts.batch_size)
+
+
+def bench_ffl_batch(map_size: int, opts, rng: random.Random):
+    """A full training batch on FFL: decoding, playing every ranking and learning."""
+    orla = ORLABaseline(list(argument_actions), 1e-3, 1e-3, torch.device("cpu"), Mode.STRICT)
+    env = FFL(argument_actions, map_size, 0.8, rng=np.random.default_rng(opts.seed))
+    def batch():
+        rankings, probs, state = orla.decode_rankings(opts.batch_size, return_state=True)
+        returns = [env.play(ranking) for ranking in rankings]
+        orla.learn(rankings, probs, returns, state)
+    return batch
+
+
+# Name, parameter swept and benchmark.
+BENCHMARKS = [
+    ("ranking_to_matrix", "n_args", bench_ranking_to_matrix),
+    ("af_construction", "n_args", bench_af_construction),
+    ("update_vaf", "n_args", bench_update_vaf),
+    ("select_action", "n_args", bench_select_action),
+    ("decode_ranking_strict", "n_args", bench_decode(Mode.STRICT)),
+    ("decode_ranking_non_strict", "n_args", bench_decode(Mode.NON_STRICT)),
+    ("decode_ranking_greedy_cached", "n_args", bench_decode_greedy(cached=True)),
+    ("decode_ranking_greedy_uncached", "n_args", bench_decode_greedy(cached=False)),
+    ("learn_strict", "n_args", bench_learn(Mode.STRICT)),
+    ("learn_non_strict", "n_args", bench_learn(Mode.NON_STRICT)),
+    ("decode_ranking_pointer_strict", "n_args", bench_decode(Mode.STRICT, "pointer")),
+    ("decode_ranking_pointer_non_strict", "n_args", bench_decode(Mode.NON_STRICT, "pointer")),
+    ("learn_pointer_strict", "n_args", bench_learn(Mode.STRICT, "pointer")),
+    ("learn_pointer_non_strict", "n_args", bench_learn(Mode.NON_STRICT, "pointer")),
+    ("decode_rankings_plackett_luce", "n_args", bench_decode_plackett_luce),
+    ("ffl_batch", "map_size", bench_ffl_batch),
+]
+
+
+def measure(fn: Callable, repeat: int, min_time: float, setup: Optional[Callable] = None) -> Dict:
+    """Times `fn` in `repeat` rounds of as many calls as fit in `min_time` seconds (at least one).
+    If `setup` is given, every call is `fn(setup())`, and only `fn` is timed."""
+    if setup is not None:
+        def timed(number: int) -> float:
+            total = 0
+            for _ in range(number):
+                inputs = setup()
+                start = time.perf_counter()
+                fn(inputs)
+                total += time.perf_counter() - start
+            return total
+    else:
+        def timed(number: int) -> float:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            return time.perf_counter() - start
+    timed(1)
+    once = timed(1)
+    number = max(1, int(min_time / max(once, 1e-9)))
+    times = [timed(number) / number for _ in range(repeat)]
+    return {"median_s": float(np.median(times)), "min_s": float(np.min(times)), "number": number, "repeat": repeat}
+
+
+def metadata() -> Dict:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "threads": torch.get_num_threads(),
+    }
+
+
+def run(opts) -> Dict:
+    results = []
+    for name, param, bench in BENCHMARKS:
+        if opts.only and not any(pattern in name for pattern in opts.only):
+            continue
+        for value in opts.args if param == "n_args" else opts.map_sizes:
+            rng = random.Random(opts.seed)
+            np.random.seed(opts.seed)
+            torch.manual_seed(opts.seed)
+            fn = bench(value, opts, rng)
+            result = {"benchmark": name, param: value}
+            if isinstance(fn, str):
+                result["skipped"] = fn
+                print("{:<34} {:>10}={:<6} skipped ({})".format(name, param, value, fn))
+            else:
+                setup, fn = fn if isinstance(fn, tuple) else (None, fn)
+                result.update(measure(fn, opts.repeat, opts.min_time, setup))
+                print("{:<34} {:>10}={:<6} {:>12.1f} us".format(name, param, value, 1e6 * result["median_s"]))
+            results.append(result)
+    return {"metadata": metadata(), "results": results}
+
+
+def _key(result: Dict):
+    return (result["benchmark"], result.get("n_args"), result.get("map_size"))
+
+
+def compare(before_path: str, after_path: str):
+    """Prints the ratio of the median times of two runs (below 1 means faster)."""
+    with open(before_path) as f:
+        before = {_key(r): r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+    print("{:<34} {:>8} {:>14} {:>14} {:>8}".format("benchmark", "param", "before (us)", "after (us)", "ratio"))
+    for result in after:
+        old = before.get(_key(result))
+        if old is None or "median_s" not in old or "median_s" not in result:
+            continue
+        param = result.get("n_args", result.get("map_size"))
+        print("{:<34} {:>8} {:>14.1f} {:>14.1f} {:>8.2f}".format(
+            result["benchmark"], param, 1e6 * old["median_s"], 1e6 * result["median_s"], result["median_s"] / old["median_s"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--args", type=int, nargs="+", default=[8, 39, 200, 1000], help="numbers of arguments")
+    parser.add_argument("--map-sizes", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--only", nargs="+", default=None, help="run the benchmarks whose name contains any of these")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per round")
+    parser.add_argument("--max-params", type=float, default=5e7, help="largest MLP network to benchmark")
+    parser.add_argument("--max-pointer-args", type=int, default=200, help="most arguments to benchmark the pointer network with")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON file for the results")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files and exit")
+    opts = parser.parse_args()
+
+    if opts.compare:
+        compare(*opts.compare)
+        return
+    results = run(opts)
+    if opts.output:
+        with open(opts.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
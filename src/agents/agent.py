@@ -2,10 +2,10 @@ from abc import ABC, abstractmethod
 from typing import List, Optional, Tuple
 import numpy as np
 from argumentation import utils as argm
-from utils import flatten, Mode
+from agents.decode_state import DecodeState
+from utils import Mode
 import torch
 from torch.distributions import Categorical
-from typing import List, Optional, Tuple
 
 class Agent(ABC):
     def __init__(self, args: List[str], mode: Mode = Mode.STRICT):
@@ -22,82 +22,68 @@ class Agent(ABC):
     def learn(self):
         pass
 
-    def remaining_arguments(self, ranking: argm.Ranking) -> argm.Arguments:
-        remaining = [arg for arg in self.args if not arg in flatten(ranking)]
-        return remaining
+    def decode_ranking(self, greedy:bool=False) -> Tuple[argm.Ranking, torch.Tensor]:
+        rankings, probabilities = self.decode_rankings(1, greedy)
+        return rankings[0], probabilities[0]
 
-    def mask_remaining(self, remaining: argm.Arguments) -> np.ndarray:
-        if self.mode == Mode.NON_STRICT:
-            mask = self.__mask_remaining_strict(remaining)
-            return mask
-        else:
-            mask = self.__mask_remaining_non_strict(remaining)
-            return mask
-        
-    def __mask_remaining_strict(self, remaining: argm.Arguments) -> np.ndarray:
-        indices = np.where(np.in1d(self.args, remaining))[0]
-        indices = np.append(indices*2, indices*2 +1)
-        mask = np.zeros(2*self.n)
-        mask[indices] = 1
-        return mask.astype(bool)
-    
-    def __mask_remaining_non_strict(self, remaining: argm.Arguments) -> np.ndarray:
-        indices = np.where(np.in1d(self.args, remaining))[0]
-        mask = np.zeros(self.n)
-        mask[indices] = 1
-        return mask.astype(bool)
+    def decode_rankings(self, batch_size: int, greedy: bool = False, return_state: bool = False) -> Tuple[List[argm.Ranking], torch.Tensor]:
+        """Decodes a batch of rankings at once, with one batched forward pass per position.
+
+        Args:
+            batch_size (int): number of rankings to decode.
+            greedy (bool, optional): whether to pick the most likely argument at each position (in inference mode,
+                so the probabilities have no gradients). Defaults to False.
+            return_state (bool, optional): whether to also return the `DecodeState`, so that `learn` can reuse it. Defaults to False.
 
-    def decode_ranking(self, greedy:bool=False) -> Tuple[List[str], List[float]]:
-        if self.mode == Mode.STRICT:
-            return self.__decode_ranking_strict(greedy)
-        if self.mode == Mode.NON_STRICT:
-            return self.__decode_ranking_non_strict(greedy)
-        
-    def __decode_ranking_strict(self, greedy: bool) -> Tuple[argm.Ranking, torch.Tensor]: 
-        if self.mode != Mode.STRICT:
-            raise RuntimeError("Attempted strict decoding.")
-        ranking = []
+        Returns:
+            Tuple[List[argm.Ranking], torch.Tensor]: the decoded rankings and a (batch_size, n) tensor with the probability of each step
+            (followed by the final `DecodeState` if `return_state`).
+        """
+        state = DecodeState(self.args, batch_size, self.mode)
         probabilities = []
-        for _ in range(self.n):
-            state = argm.ranking_to_matrix(ranking, self.args, True)
-            remaining = self.remaining_arguments(ranking)
-            mask = self.mask_remaining(remaining)
-            probs = self.get_action_probs(state, mask)
-            distribution = Categorical(probs)
-            sample_idx = torch.argmax(probs) if greedy else distribution.sample()
-            ranking.append([self.args[sample_idx]])
-            probabilities.append(probs[sample_idx])
-        probabilities = torch.stack(probabilities)
-        return ranking, probabilities
+        rows = torch.arange(batch_size)
+        # Greedy rankings are not learnt from, so they are decoded without tracking gradients.
+        with torch.inference_mode(greedy):
+            for _ in range(self.n):
+                probs = self.get_action_probs(state.matrix, state.masks())
+                indices = torch.argmax(probs, dim=-1) if greedy else Categorical(probs).sample()
+                state.append_outputs(indices.cpu().numpy())
+                probabilities.append(probs[rows, indices])
+            probabilities = torch.stack(probabilities, dim=1)
+        if return_state:
+            return state.rankings, probabilities, state
+        return state.rankings, probabilities
+
+    def evaluate_rankings(self, rankings: List[argm.Ranking], log_probs: bool = False) -> torch.Tensor:
+        """Probabilities of decoding the given (complete) rankings with the current policy.
+
+        The rankings are replayed in a batch (teacher forcing), with one forward pass per position, so the
+        probabilities can be learnt from even if the rankings were decoded with an older policy.
+
+        Args:
+            rankings (List[argm.Ranking]): rankings to evaluate, e.g., as returned by `decode_rankings`.
+            log_probs (bool, optional): whether to return log-probabilities. Defaults to False.
 
-    def __decode_ranking_non_strict(self, greedy: bool) -> Tuple[argm.Ranking, torch.Tensor]: 
-        if self.mode != Mode.NON_STRICT:
-            raise RuntimeError("Attempted non-strict decoding on a strict .")
-        ranking = []
+        Returns:
+            torch.Tensor: a (len(rankings), n) tensor with the probability (or log-probability) of each step.
+        """
+        state = DecodeState(self.args, len(rankings), self.mode)
         probabilities = []
-        for _ in range(self.n):
-            state = argm.ranking_to_matrix(ranking, self.args, True)
-            remaining = self.remaining_arguments(ranking)
-            mask = self.mask_remaining(remaining)
-            probs = self.get_action_probs(state, mask)
-            m = Categorical(probs)
-            idx = torch.argmax(probs) if greedy else m.sample()
-            if idx %2 == 0:
-                # Append to new level
-                idx_arg = int(idx/2)
-                new_arg = self.args[idx_arg]
-                ranking.append([new_arg])
+        rows = torch.arange(len(rankings))
+        for indices, new_level in state.replay(rankings):
+            probs = self.get_action_probs(state.matrix, state.masks())
+            if self.mode == Mode.NON_STRICT:
+                # Output 2i starts a new level with argument i and output 2i+1 joins the last one,
+                # except at the first step, where both start the ranking.
+                probs = probs.view(len(rankings), self.n, 2)[rows, torch.from_numpy(indices)]
+                probabilities.append(probs.sum(dim=1) if state.t == 0 else probs[rows, torch.from_numpy(~new_level).long()])
             else:
-                #Append to previous level
-                idx_arg = int((idx-1)/2)
-                new_arg = self.args[idx_arg]
-                if len(ranking) == 0:
-                    ranking.append([new_arg])
-                else:
-                    ranking[-1].extend([new_arg])
-            probabilities.append(probs[idx])
-        probabilities = torch.stack(probabilities)
-        return ranking, probabilities
+                probabilities.append(probs[rows, torch.from_numpy(indices)])
+            state.append(indices, new_level)
+        probabilities = torch.stack(probabilities, dim=1)
+        if log_probs:
+            return torch.log(probabilities.clamp_min(torch.finfo(probabilities.dtype).tiny))
+        return probabilities
 
     def save_ranking(self, path: str, ranking: argm.Ranking = None):
         if ranking == None:
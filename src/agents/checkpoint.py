@@ -0,0 +1,124 @@
+import copy
+import os
+import random
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+import torch
+
+
+def rng_state() -> Dict:
+    """State of all the random number generators used in training (Python, NumPy and PyTorch)."""
+    state = {
+        'python': random.getstate(),
+        'numpy': np.random.get_state(),
+        'torch': torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state['torch_cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state: Dict):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    # RNG states are CPU byte tensors, even if they were loaded on another device.
+    torch.set_rng_state(state['torch'].cpu())
+    if 'torch_cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all([s.cpu() for s in state['torch_cuda']])
+
+
+def atomic_save(obj, path: str):
+    """Saves `obj` with `torch.save` under a temporary name and then renames it, so `path` is never half written."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        torch.save(obj, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load(path: str) -> Dict:
+    """Loads a checkpoint on the CPU. `load_state_dict` moves the weights to the device of the agent,
+    while the RNG states must stay on the CPU (see `set_rng_state`)."""
+    # Checkpoints hold NumPy arrays and RNG states, not only tensors.
+    return torch.load(path, map_location='cpu', weights_only=False)
+
+
+class Checkpointer:
+    """Saves checkpoints of an agent periodically, on a background thread.
+
+    The state of the agent is copied on the calling thread (see `ORLA.state_dict`), so training can continue
+    while the copy is written. If a checkpoint is still waiting to be written when the next one is taken,
+    only the newest one is written.
+    """
+    def __init__(self, agent, path: str, every: int = 1000):
+        """Initialise the checkpointer.
+
+        Args:
+            agent: agent with `state_dict`, `load_state_dict` and an `episodes` counter (e.g., `ORLABaseline`).
+            path (str): path of the checkpoint file.
+            every (int, optional): episodes between checkpoints. Defaults to 1000.
+        """
+        self.agent = agent
+        self.path = path
+        self.every = every
+        self._last = agent.episodes
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._future: Optional[Future] = None
+
+    def step(self, **extra) -> bool:
+        """Saves a checkpoint if `every` episodes have been learnt since the last one.
+
+        Call it after `learn`, so that checkpoints are taken between batches.
+        Args:
+            **extra: other (picklable) state of the run to save with the agent, e.g., the training metrics.
+        Returns:
+            bool: whether a checkpoint was taken.
+        """
+        if self.agent.episodes - self._last < self.every:
+            return False
+        self.save(**extra)
+        return True
+
+    def save(self, blocking: bool = False, **extra):
+        state = self.agent.state_dict()
+        state['extra'] = copy.deepcopy(extra)
+        self._last = self.agent.episodes
+        if self._future is not None:
+            # Drop the previous checkpoint if it has not started to be written yet.
+            self._future.cancel()
+        self._future = self._writer.submit(atomic_save, state, self.path)
+        if blocking:
+            self.wait()
+
+    def wait(self):
+        """Waits until the last checkpoint is written (and raises the error of the write, if any)."""
+        if self._future is not None and not self._future.cancelled():
+            self._future.result()
+
+    def resume(self) -> Optional[Dict]:
+        """Restores the agent (and the RNGs) from the checkpoint, if there is one.
+        Returns:
+            Optional[Dict]: the extra state saved with the checkpoint, or None if there is no checkpoint.
+        """
+        if not os.path.exists(self.path):
+            return None
+        state = load(self.path)
+        self.agent.load_state_dict(state)
+        self._last = self.agent.episodes
+        return state['extra']
+
+    def close(self):
+        self.wait()
+        self._writer.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,112 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from argumentation import utils as argm
+from utils import Mode
+
+
+class DecodeState:
+    """Incremental state of a batch of (partial) rankings being decoded.
+
+    Keeps, for each ranking in the batch, the matrix returned by `argm.ranking_to_matrix(ranking, args, True)`
+    and the mask of remaining arguments. Appending an argument only rewrites the row of that argument,
+    so each step costs O(n) instead of rebuilding the whole matrix.
+    """
+    def __init__(self, args: argm.Arguments, batch_size: int = 1, mode: Mode = Mode.STRICT):
+        """Initialise the state with empty rankings.
+
+        Args:
+            args (argm.Arguments): full list of arguments. Matrices and masks preserve indices with this list.
+            batch_size (int, optional): number of rankings decoded in parallel. Defaults to 1.
+            mode (Mode, optional): whether the rankings are strict or not. Defaults to Mode.STRICT.
+        """
+        self.args = args
+        self.n = len(args)
+        self.index: Dict[str, int] = {arg: i for i, arg in enumerate(args)}
+        self.batch_size = batch_size
+        self.mode = mode
+        self.t = 0
+        self.rankings: List[argm.Ranking] = [[] for _ in range(batch_size)]
+        # The empty ranking is encoded as a matrix full of ones.
+        self.matrix = np.ones((batch_size, self.n, self.n), dtype=bool)
+        self.remaining = np.ones((batch_size, self.n), dtype=bool)
+        # Arguments in the levels above the last one, and arguments in the last level.
+        self.higher = np.zeros((batch_size, self.n), dtype=bool)
+        self.last_level = np.zeros((batch_size, self.n), dtype=bool)
+        # Index of the argument appended at each step.
+        self.order = np.zeros((batch_size, self.n), dtype=int)
+        self._rows = np.arange(batch_size)
+
+    @classmethod
+    def from_rankings(cls, args: argm.Arguments, rankings: List[argm.Ranking], mode: Mode = Mode.STRICT) -> "DecodeState":
+        """Creates the state obtained after appending, one by one, all the arguments of the given rankings."""
+        state = cls(args, len(rankings), mode)
+        for indices, new_level in state.replay(rankings):
+            state.append(indices, new_level)
+        return state
+
+    def replay(self, rankings: List[argm.Ranking]):
+        """Yields, step by step, the (indices, new_level) pairs that rebuild the given (complete) rankings."""
+        steps = [
+            [(self.index[arg], i_arg == 0) for level in ranking for i_arg, arg in enumerate(level)]
+            for ranking in rankings
+        ]
+        for t in range(len(steps[0])):
+            indices = np.array([episode[t][0] for episode in steps])
+            new_level = np.array([episode[t][1] for episode in steps])
+            yield indices, new_level
+
+    def appended_rows(self) -> np.ndarray:
+        """Returns a (batch_size, t, n) array with the row written at each step.
+
+        The state before step t is the empty ranking (all ones) with the rows of the first t steps written in.
+        """
+        return self.matrix[self._rows[:, None], self.order[:, :self.t]]
+
+    def masks(self) -> np.ndarray:
+        """Returns the masks of remaining outputs of the network, one row per ranking."""
+        if self.mode == Mode.NON_STRICT:
+            # Each argument can either start a new level or be appended to the previous one.
+            return np.repeat(self.remaining, 2, axis=1)
+        return self.remaining.copy()
+
+    def append_outputs(self, outputs: np.ndarray):
+        """Appends the arguments selected by the network outputs (one per ranking in the batch)."""
+        outputs = np.asarray(outputs)
+        if self.mode == Mode.NON_STRICT:
+            self.append(outputs // 2, outputs % 2 == 0)
+        else:
+            self.append(outputs, np.ones(self.batch_size, dtype=bool))
+
+    def append(self, indices: np.ndarray, new_level: Optional[np.ndarray] = None):
+        """Appends one argument to each ranking of the batch.
+
+        Args:
+            indices (np.ndarray): index (in `args`) of the argument appended to each ranking.
+            new_level (Optional[np.ndarray], optional): whether each argument starts a new level or
+                joins the last one. Defaults to starting a new level.
+        """
+        indices = np.asarray(indices)
+        if new_level is None or self.t == 0:
+            # The first argument always starts a new level.
+            new_level = np.ones(self.batch_size, dtype=bool)
+        new_level = np.asarray(new_level, dtype=bool)
+
+        # Starting a new level moves the last level to the higher ones.
+        self.higher[new_level] |= self.last_level[new_level]
+        self.last_level[new_level] = False
+        self.last_level[self._rows, indices] = True
+        self.remaining[self._rows, indices] = False
+
+        # The row of the appended argument only keeps the arguments in higher levels (and the diagonal).
+        self.matrix[self._rows, indices] = self.higher
+        self.matrix[self._rows, indices, indices] = True
+        self.order[:, self.t] = indices
+
+        for ranking, idx, new in zip(self.rankings, indices.tolist(), new_level.tolist()):
+            if new:
+                ranking.append([self.args[idx]])
+            else:
+                ranking[-1].append(self.args[idx])
+        self.t += 1
@@ -1,8 +1,10 @@
 from agents.agent import Agent
-from argumentation import utils as argm
+from agents.checkpoint import rng_state, set_rng_state
+from agents.decode_state import DecodeState
 from utils import Mode
 
-from typing import List, Optional
+import copy
+from typing import Dict, List, Optional, Union
 import numpy as np
 import torch
 import torch.nn as nn
@@ -11,12 +13,30 @@ import torch.nn.functional as F
 
 
 class ORLA(Agent):
-    def __init__(self, args: List[str], alpha_th:float,  device: torch.device, mode: Mode):
+    def __init__(self, args: List[str], alpha_th:float,  device: torch.device, mode: Mode, architecture: str = 'mlp', net_kwargs: Optional[Dict] = None):
+        """Initialise the agent.
+        Args:
+            args (List[str]): arguments to rank.
+            alpha_th (float): learning rate of the policy.
+            device (torch.device): device of the network.
+            mode (Mode): whether the rankings are strict or not.
+            architecture (str, optional): policy network, 'mlp' (`Net`, with n^4 weights) or 'pointer' (`PointerNet`,
+                whose size grows linearly with n). Defaults to 'mlp'.
+            net_kwargs (Optional[Dict], optional): other arguments of the network (e.g., `dim` of `PointerNet`). Defaults to None.
+        """
         super().__init__(args, mode)
-        self.net = self.Net(self.n, mode).to(device)
+        self.architecture = architecture
+        self.net = self.architectures()[architecture](self.n, mode, **(net_kwargs or {})).to(device)
         self.device = device
         self.optimizer = optim.Adam(self.net.parameters(), lr=alpha_th)
         # self.optimizer = optim.SGD(self.net.parameters(), lr=alpha_th)
+        # Episodes and updates learnt so far.
+        self.episodes = 0
+        self.updates = 0
+        # Persistent inputs of the network when decoding without gradients, by name.
+        self._buffers: Dict[str, torch.Tensor] = {}
+        # Greedy ranking and its probabilities, with the number of updates they were decoded after.
+        self._greedy = None
 
     class Net(nn.Module):
         def __init__(self, n: int, mode: Mode):
@@ -35,46 +55,171 @@ class ORLA(Agent):
             # x = self.fc_h(x)
             # x = F.relu(x)
             logits = self.fc_out(x)
-            logits[~self.mask] = float('-inf') # If not remaining, -inf
-            return F.softmax(logits, dim=0)
+            logits = logits.masked_fill(~self.mask, float('-inf')) # If not remaining, -inf
+            return F.softmax(logits, dim=-1)
+
+    class PointerNet(nn.Module):
+        """Scores each argument from its own embedding and its row and column of the state, after self-attention
+        among the arguments. Parameters grow linearly with n (instead of n^4, as in `Net`).
+
+        In non-strict mode, each argument gets two scores (start a new level or join the last one), interleaved
+        as the outputs of `Net`.
+        """
+        def __init__(self, n: int, mode: Mode, dim: int = 64, heads: int = 4, layers: int = 1):
+            super().__init__()
+            self.n = n
+            self.outputs_per_arg = 1 if mode == Mode.STRICT else 2
+            output_size = self.outputs_per_arg * n
+
+            self.embedding = nn.Parameter(0.02 * torch.randn(n, dim))
+            # Argument i reads its row (the arguments ranked above it) and its column (those it is ranked above).
+            self.fc_row = nn.Linear(n, dim, bias=False)
+            self.fc_col = nn.Linear(n, dim, bias=False)
+            self.norm = nn.LayerNorm(dim)
+            if layers > 0:
+                layer = nn.TransformerEncoderLayer(dim, heads, dim_feedforward=2*dim, dropout=0., batch_first=True)
+                self.encoder = nn.TransformerEncoder(layer, layers, enable_nested_tensor=False)
+            else:
+                self.encoder = nn.Identity()
+            self.fc_context = nn.Linear(dim, dim)
+            self.fc_out = nn.Linear(dim, self.outputs_per_arg)
+            self.mask = torch.ones(output_size) # mask out the appended arguments
+
+        def forward(self, x):
+            # x holds flattened states, as the input of `Net`.
+            batch_shape = x.shape[:-1]
+            state = x.reshape(-1, self.n, self.n)
+            h = self.embedding + self.fc_row(state) + self.fc_col(state.transpose(1, 2))
+            h = self.encoder(self.norm(h))
+            # Pointer-style scores: each argument against the context of all of them.
+            context = self.fc_context(h.mean(dim=1, keepdim=True))
+            logits = self.fc_out(torch.tanh(h + context))
+            logits = logits.reshape(*batch_shape, self.outputs_per_arg * self.n)
+            logits = logits.masked_fill(~self.mask, float('-inf')) # If not remaining, -inf
+            return F.softmax(logits, dim=-1)
+
+    @classmethod
+    def architectures(cls) -> Dict[str, type]:
+        return {'mlp': cls.Net, 'pointer': cls.PointerNet}
 
     def get_action_probs(self, state: np.ndarray, mask: Optional[np.ndarray] = None) -> torch.Tensor:
-        state_flat = torch.from_numpy(state).float().flatten().to(self.device)
-        self.net.mask = torch.from_numpy(mask).bool().to(self.device)
+        # A stack of states (B, n, n) is flattened per row to (B, n*n).
+        shape = state.shape[:-2] + (self.n*self.n,)
+        if torch.is_grad_enabled():
+            # The inputs are kept by autograd until `learn`, so each call needs new tensors.
+            state_flat = torch.from_numpy(state).float().reshape(shape).to(self.device)
+            self.net.mask = torch.from_numpy(mask).bool().to(self.device)
+        else:
+            # Without gradients, the inputs are copied into persistent device tensors.
+            state_flat = self._input_buffer('state', shape, torch.float32)
+            state_flat.copy_(torch.from_numpy(state).reshape(shape))
+            self.net.mask = self._input_buffer('mask', mask.shape, torch.bool)
+            self.net.mask.copy_(torch.from_numpy(mask))
         probs = self.net(state_flat)
         return probs
 
-    def learn(self, probs: torch.Tensor, advantages: torch.Tensor):
-        loss = torch.mul(torch.log(probs),advantages)
+    def _input_buffer(self, name: str, shape, dtype: torch.dtype) -> torch.Tensor:
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = self._buffers[name] = torch.empty(shape, dtype=dtype, device=self.device)
+        return buffer
+
+    def decode_ranking(self, greedy: bool = False):
+        """See `Agent.decode_ranking`. The greedy ranking is cached until the next `learn` or `load_state_dict`
+        (the network must not be modified otherwise, or the cache must be cleared by setting `_greedy` to None)."""
+        if not greedy:
+            return super().decode_ranking(greedy)
+        if self._greedy is None or self._greedy[0] != self.updates:
+            self._greedy = (self.updates, super().decode_ranking(True))
+        ranking, probs = self._greedy[1]
+        return [list(level) for level in ranking], probs
+
+    def learn(self, probs: torch.Tensor, advantages: torch.Tensor, log_probs: bool = False, weights: Optional[torch.Tensor] = None):
+        if not log_probs:
+            # Probabilities that underflowed to 0 would give an infinite loss and NaN gradients.
+            probs = torch.log(probs.clamp_min(torch.finfo(probs.dtype).tiny))
+        loss = torch.mul(probs,advantages)
+        if weights is not None:
+            # Per-episode weights, e.g., importance weights of episodes sampled from an older policy.
+            loss = loss * weights[:, None]
         loss = - loss.sum()
         self.optimizer.zero_grad()
         loss.backward()
         self.optimizer.step()
+        self.episodes += len(advantages)
+        self.updates += 1
+
+    def state_dict(self) -> Dict:
+        """Snapshot of everything needed to resume training: network, optimiser, counters and RNG states.
+        It holds copies, so it can be written (see `Checkpointer`) while training goes on.
+        """
+        return {
+            'net': {k: v.detach().clone() for k, v in self.net.state_dict().items()},
+            'optimizer': copy.deepcopy(self.optimizer.state_dict()),
+            'episodes': self.episodes,
+            'updates': self.updates,
+            'rng': rng_state(),
+        }
+
+    def load_state_dict(self, state: Dict):
+        self.net.load_state_dict(state['net'])
+        self.optimizer.load_state_dict(state['optimizer'])
+        self.episodes = state['episodes']
+        self.updates = state['updates']
+        self._greedy = None
+        set_rng_state(state['rng'])
 
 class ORLABaseline(ORLA):
-    def __init__(self, args: List[str], alpha_th: float, alpha_w: float, device: torch.device, mode: Mode):
-        super().__init__(args, alpha_th, device, mode)
+    def __init__(self, args: List[str], alpha_th: float, alpha_w: float, device: torch.device, mode: Mode, architecture: str = 'mlp', net_kwargs: Optional[Dict] = None):
+        super().__init__(args, alpha_th, device, mode, architecture, net_kwargs)
         self.w = np.zeros((self.n, self.n))
         self.alpha_w = alpha_w
 
+    def state_dict(self) -> Dict:
+        state = super().state_dict()
+        state['w'] = self.w.copy()
+        return state
+
+    def load_state_dict(self, state: Dict):
+        super().load_state_dict(state)
+        self.w = state['w'].copy()
+
     def state_value(self, state: np.ndarray):
         return np.sum(self.w[state])
 
-    def learn(self, rankings: List[List[str]],  probs: List[torch.Tensor], final_returns: List[float]):
-        deltas = []
-        step_w = np.zeros_like(self.w)
+    def learn(self, rankings: List[List[str]],  probs: Union[List[torch.Tensor], torch.Tensor], final_returns: List[float], state: Optional[DecodeState] = None, log_probs: bool = False, weights: Optional[torch.Tensor] = None):
+        """Updates the baseline weights and the policy with a batch of episodes.
+
+        Args:
+            rankings (List[List[str]]): rankings played in each episode.
+            probs (Union[List[torch.Tensor], torch.Tensor]): probabilities of each decoding step, per episode.
+            final_returns (List[float]): return obtained in each episode.
+            state (Optional[DecodeState], optional): state captured while decoding the rankings (see `decode_rankings`).
+                If not given, it is rebuilt from the rankings.
+            log_probs (bool, optional): whether `probs` are log-probabilities (e.g., from `evaluate_rankings`). Defaults to False.
+            weights (Optional[torch.Tensor], optional): weight of each episode in the policy gradient. Defaults to None.
+        """
+        if state is None:
+            state = DecodeState.from_rankings(self.args, rankings, self.mode)
+        final_returns = np.asarray(final_returns, dtype=float)
+        order = state.order[:, :state.t]
+        rows = state.appended_rows()
 
-        for i in range(len(final_returns)): # for each episode in the batch
-            delta = []
-            for t in range(self.n): # for each step in the episode
-                state_t = argm.ranking_to_matrix(rankings[i][:t], self.args, True)
-                delta_t = final_returns[i] - self.state_value(state_t)
-                step_w[state_t] += self.alpha_w * delta_t
-                delta.append(delta_t)
-            deltas.append(delta)
-        self.w += step_w
+        # The state before step t is the all-ones matrix with the rows of the first t steps written in,
+        # so its value is sum(w) plus the cumulative change of value of each appended row.
+        w_rows = self.w[order]
+        gains = np.sum(w_rows * rows, axis=2) - np.sum(w_rows, axis=2)
+        values = np.sum(self.w) + np.cumsum(gains, axis=1) - gains
+        deltas = final_returns[:, None] - values
 
+        # Every entry of the state is one until its row is written at step s, after which it keeps the value
+        # of that row. Hence, each entry accumulates all the deltas but those after s where the row is zero.
+        after = np.cumsum(deltas[:, ::-1], axis=1)[:, ::-1] - deltas
+        step_w = np.full_like(self.w, np.sum(deltas))
+        np.add.at(step_w, order, -after[:, :, None] * ~rows)
+        self.w += self.alpha_w * step_w
 
-        probs_batch = torch.stack(probs)
+        # Accept a list of per-episode probabilities or a (B, n) tensor from `decode_rankings`.
+        probs_batch = probs if torch.is_tensor(probs) else torch.stack(probs)
         deltas_batch = torch.FloatTensor(deltas).to(self.device)
-        super().learn(probs_batch, deltas_batch)
\ No newline at end of file
+        super().learn(probs_batch, deltas_batch, log_probs, weights)
\ No newline at end of file
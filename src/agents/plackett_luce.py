@@ -0,0 +1,93 @@
+from agents.decode_state import DecodeState
+from agents.orla import ORLABaseline
+from argumentation import utils as argm
+from utils import Mode
+
+from typing import Dict, List, Tuple
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+class PlackettLuce(ORLABaseline):
+    """ORLA with a Plackett-Luce policy: one score per argument, and strict rankings sampled in a single draw.
+
+    Sorting the scores perturbed with Gumbel noise samples a ranking from the Plackett-Luce distribution
+    (Gumbel top-k), where each position picks a remaining argument with probability softmax(scores) over the
+    remaining arguments. Hence the probability of each position has a closed form, and the rankings can be
+    learnt with the same REINFORCE with baseline as `ORLABaseline`.
+    """
+    def __init__(self, args: List[str], alpha_th: float, alpha_w: float, device: torch.device, mode: Mode = Mode.STRICT):
+        if mode != Mode.STRICT:
+            raise ValueError("Plackett-Luce rankings are strict")
+        super().__init__(args, alpha_th, alpha_w, device, mode, architecture='scores')
+
+    class Net(nn.Module):
+        """Scores of the arguments. Given a state, returns the probability of appending each remaining argument."""
+        def __init__(self, n: int, mode: Mode):
+            super().__init__()
+            self.n = n
+            self.scores = nn.Parameter(torch.zeros(n))
+            self.mask = torch.ones(n) # mask out the appended arguments
+
+        def forward(self, x):
+            # The state only matters through the mask of remaining arguments.
+            logits = self.scores.expand(*x.shape[:-1], self.n)
+            logits = logits.masked_fill(~self.mask, float('-inf')) # If not remaining, -inf
+            return F.softmax(logits, dim=-1)
+
+    @classmethod
+    def architectures(cls) -> Dict[str, type]:
+        return {'scores': cls.Net}
+
+    def decode_rankings(self, batch_size: int, greedy: bool = False, return_state: bool = False, log_probs: bool = False) -> Tuple[List[argm.Ranking], torch.Tensor]:
+        """Samples a batch of strict rankings at once (see `Agent.decode_rankings`).
+
+        Args:
+            batch_size (int): number of rankings to decode.
+            greedy (bool, optional): whether to rank the arguments by score. Defaults to False.
+            return_state (bool, optional): whether to also return the `DecodeState` of the rankings (for `learn`). Defaults to False.
+            log_probs (bool, optional): whether to return the exact log-probabilities, which do not underflow
+                (see `learn`). Defaults to False.
+
+        Returns:
+            Tuple[List[argm.Ranking], torch.Tensor]: the rankings and a (batch_size, n) tensor with the probability
+            (or log-probability) of the argument chosen at each position.
+        """
+        # Greedy rankings are not learnt from, so they are decoded without tracking gradients.
+        with torch.inference_mode(greedy):
+            scores = self.net.scores.expand(batch_size, self.n)
+            if greedy:
+                keys = scores.detach()
+            else:
+                # Gumbel top-k: the order of the perturbed scores follows the Plackett-Luce distribution.
+                gumbel = -torch.log(-torch.log(torch.rand(batch_size, self.n, device=scores.device)))
+                keys = scores.detach() + gumbel
+            order = torch.argsort(keys, dim=1, descending=True)
+
+            probs = self._log_probs(scores, order)
+            if not log_probs:
+                probs = torch.exp(probs)
+
+        order = order.cpu().numpy()
+        rankings = [[[self.args[i]] for i in row] for row in order.tolist()]
+        if not return_state:
+            return rankings, probs
+        state = DecodeState(self.args, batch_size, self.mode)
+        for t in range(self.n):
+            state.append(order[:, t])
+        return rankings, probs, state
+
+    def evaluate_rankings(self, rankings: List[argm.Ranking], log_probs: bool = False) -> torch.Tensor:
+        """See `Agent.evaluate_rankings`. The probabilities have a closed form, so no replay is needed."""
+        index = {arg: i for i, arg in enumerate(self.args)}
+        order = torch.tensor([[index[level[0]] for level in ranking] for ranking in rankings], device=self.device)
+        probs = self._log_probs(self.net.scores.expand(len(rankings), self.n), order)
+        return probs if log_probs else torch.exp(probs)
+
+    @staticmethod
+    def _log_probs(scores: torch.Tensor, order: torch.Tensor) -> torch.Tensor:
+        """Log-probability of each position of the rankings: s[order[t]] - logsumexp(s[order[t:]])."""
+        ordered = torch.gather(scores, 1, order)
+        remaining = torch.logcumsumexp(ordered.flip(1), dim=1).flip(1)
+        return ordered - remaining
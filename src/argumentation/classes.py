@@ -2,9 +2,9 @@ from abc import ABC, abstractmethod
 
 import numpy as np
 import networkx as nx
-from typing import Tuple, List
+from typing import Tuple, List, Union
 
-from utils import flatten
+from argumentation.semantics import BitsetAF
 
 # Attacks are just tupples (attacker, attacked).
 # An Attack type is created for convenience.
@@ -15,59 +15,99 @@ class ArgumentationFramework:
     """
     def __init__(self,
         args: List[str] = [],
-        atts: List[Attack] = []
+        atts: Union[List[Attack], np.ndarray] = []
     ):
         """Initialise the Argumentation Framework
         Args:
             args (List[str], optional): List of arguments that comprise the AF. Defaults to [].
-            atts (List[Attack], optional): List of attacks in the AF. Defaults to [].
+            atts (Union[List[Attack], np.ndarray], optional): List of attacks in the AF, or its NxN attack matrix
+                (indexed as `args`). Defaults to [].
         """
         self.args = []
-        self.atts = []
-        # The entire AF can be represented with a binary matrix NxN, where mat[attacker, attacked] = 1
-        self.mat = np.zeros((0, 0))
+        # Index of each argument in self.args (and in the matrix).
+        self._index = {}
+        # Attacks are kept in an (insertion-ordered) dict for O(1) membership tests.
+        # None means that they have to be recovered from the matrix.
+        self._atts = {}
+        # The entire AF can be represented with a binary matrix NxN, where mat[attacker, attacked] = 1.
+        # The matrix is a view on a larger buffer, so that adding arguments does not reallocate it every time.
+        self._mat = np.zeros((0, 0))
         self.add_arguments(args)
-        self.add_attacks(atts)
+        if isinstance(atts, np.ndarray):
+            self.set_attack_matrix(atts)
+        else:
+            self.add_attacks(atts)
+
+    @property
+    def mat(self) -> np.ndarray:
+        n = len(self.args)
+        return self._mat[:n, :n]
+
+    @mat.setter
+    def mat(self, mat: np.ndarray):
+        self._mat = mat
+
+    @property
+    def atts(self) -> List[Attack]:
+        if self._atts is None:
+            attackers, attacked = np.nonzero(self.mat)
+            self._atts = {(self.args[i], self.args[j]): None for i, j in zip(attackers, attacked)}
+        return list(self._atts)
+
+    def index(self, argument: str) -> int:
+        """Returns the index of the argument in the matrix."""
+        return self._index[argument]
 
     def add_argument(self,
         argument: str
     ):
-        assert argument not in self.args, "{} already in arguments".format(argument)
-        self.args.append(argument)
-        self.expand_mat()
+        self.add_arguments([argument])
 
     def add_arguments(self,
         arguments: List[str]
     ):
         for arg in arguments:
-            self.add_argument(arg)
+            assert arg not in self._index, "{} already in arguments".format(arg)
+            self._index[arg] = len(self.args)
+            self.args.append(arg)
+        self.expand_mat()
 
     def add_attacks(self,
         attacks: List[Attack]
     ):
-        for att in attacks:
-            self.add_attack(att)
+        attacks = list(attacks)
+        self.add_arguments(list(dict.fromkeys(arg for att in attacks for arg in att if arg not in self._index)))
+        if self._atts is not None:
+            attacks = [att for att in attacks if att not in self._atts]
+            self._atts.update(dict.fromkeys(attacks))
+        if len(attacks) == 0:
+            return
+        attackers = [self._index[att[0]] for att in attacks]
+        attacked = [self._index[att[1]] for att in attacks]
+        self.mat[attackers, attacked] = 1
 
     def add_attack(self,
         attack: Attack
     ):
-        for arg in attack:
-            if arg not in self.args:
-                self.args.append(arg)
-        self.expand_mat()
-        attacker = self.args.index(attack[0])
-        attacked = self.args.index(attack[1])
-        if attack not in self.atts:
-            self.atts.append(attack)
-            self.mat[attacker, attacked] = 1
+        self.add_attacks([attack])
+
+    def set_attack_matrix(self, mat: np.ndarray):
+        """Replaces all the attacks of the AF at once.
+        Args:
+            mat (np.ndarray): NxN matrix, indexed as `args`, where mat[attacker, attacked] = 1.
+        """
+        assert mat.shape == self.mat.shape, "expected a {} matrix, got {}".format(self.mat.shape, mat.shape)
+        self.mat[:] = mat
+        self._atts = None
 
     def remove_attack(self,
         attack: Attack
     ):
-        i_attacker = self.args.index(attack[0])
-        i_attacked = self.args.index(attack[1])
+        i_attacker = self._index[attack[0]]
+        i_attacked = self._index[attack[1]]
         self.mat[i_attacker, i_attacked] = 0
-        self.atts.remove(attack)
+        if self._atts is not None:
+            del self._atts[attack]
 
     def remove_attacks(self,
         attacks: List[Attack]
@@ -78,29 +118,34 @@ class ArgumentationFramework:
     def remove_argument(self,
         argument: str
     ):
-        i_arg = self.args.index(argument)
-        self.mat = np.delete(self.mat, i_arg, 0)
-        self.mat = np.delete(self.mat, i_arg, 1)
-        self.args.remove(argument)
+        self.remove_arguments([argument])
 
     def remove_arguments(self,
         arguments: List[str]
     ):
-        for arg in arguments:
-            self.remove_argument(arg)
+        arguments = set(arguments)
+        if len(arguments) == 0:
+            return
+        missing = arguments - self._index.keys()
+        if missing:
+            raise ValueError("{} not in arguments".format(missing))
+        keep = np.array([arg not in arguments for arg in self.args])
+        self.mat = self.mat[keep][:, keep]
+        self.args = [arg for arg in self.args if arg not in arguments]
+        self._index = {arg: i for i, arg in enumerate(self.args)}
+        self._atts = None
 
     def expand_mat(self):
-        """The matrix needs to be expanded when a new argument is added."""
+        """The matrix needs to be expanded when a new argument is added.
+        Its capacity is doubled, so that adding arguments one by one takes amortised constant time."""
         nA = len(self.args)
-        nM = len(self.mat)
-        diff = nA - nM
-        if diff == 0:
+        nM = len(self._mat)
+        if nA <= nM:
             return
-        padding = np.zeros((diff, nM))
-        self.mat = np.vstack((self.mat, padding))
-        padding = np.zeros((nA, diff))
-        self.mat = np.hstack((self.mat, padding))
-
+        capacity = max(nA, 2*nM)
+        mat = np.zeros((capacity, capacity))
+        mat[:nM, :nM] = self._mat
+        self._mat = mat
 
     def draw(self):
         G = nx.from_numpy_array(
@@ -117,36 +162,126 @@ class ValuebasedArgumentationFramework(ArgumentationFramework):
     def __init__(
         self,
         args: List[str] = [],
-        atts: List[Attack] = [],
+        atts: Union[List[Attack], np.ndarray] = [],
         order : List[str] = [],
         update_on_init: bool = True
     ):
         """Initialise the VAF
         Args:
             args (List[str], optional): list of arguments that comprise the AF. Defaults to [].
-            atts (List[Attack], optional): list of attacks in the AF. Defaults to [].
+            atts (Union[List[Attack], np.ndarray], optional): list of attacks in the AF, or its attack matrix. Defaults to [].
             order (List[str], optional): order of arguments. Defaults to [].
             update_on_init (bool, optional): whether to update the attacks of the AF on initialisation. Defaults to True.
         """
+        # Attacks of the AF before applying any order, so that the VAF can be re-ordered.
+        # Like the matrix of the AF, it is a buffer whose top-left NxN block holds the attacks.
+        self._base_mat = np.zeros((0, 0))
         super().__init__(args, atts)
         self.order = order
         if update_on_init:
             self.update_vaf()
 
+    def ranks(self) -> np.ndarray:
+        """Returns the level of each argument in the order (np.inf for the arguments that are not ranked)."""
+        ranks = np.full(len(self.args), np.inf)
+        for i_order, level in enumerate(self.order):
+            for arg in level:
+                ranks[self._index[arg]] = i_order
+        return ranks
+
     def update_vaf(self):
         """Remove the attacks from all arguments with lower preference.
         """
-        for i_order, level in enumerate(self.order):
-            higher = self.order[0:i_order+1]
-            higher = list(flatten(higher))
-            mask = np.isin(self.args, higher, invert=True)
-            for arg in level:
-                i_arg = self.args.index(arg)
-                # print(self.args)
-                # print(self.order)
-                # print(i_order)
-                # print(arg)
-                # print(higher)
-                # print(mask)
-                # print()
-                self.mat[:, i_arg][mask] = 0
\ No newline at end of file
+        # An attack (attacker, attacked) is removed if the attacker is ranked below the attacked argument.
+        ranks = self.ranks()
+        self.mat[ranks[:, None] > ranks[None, :]] = 0
+        # The removed attacks are recovered from the matrix when `atts` is next read.
+        self._atts = None
+
+    def reorder(self, order: List[str]):
+        """Applies a new order to the attacks of the original AF, without rebuilding the VAF.
+        Args:
+            order (List[str]): new order of arguments.
+        """
+        self.order = order
+        n = len(self.args)
+        self.mat[:] = self._base_mat[:n, :n]
+        self.update_vaf()
+
+    # The structural changes below are mirrored in the attacks of the original AF.
+
+    def expand_mat(self):
+        super().expand_mat()
+        # Grow the original attacks with the capacity of the matrix.
+        capacity = len(self._mat)
+        n_base = len(self._base_mat)
+        if n_base < capacity:
+            base_mat = np.zeros((capacity, capacity))
+            base_mat[:n_base, :n_base] = self._base_mat
+            self._base_mat = base_mat
+
+    def add_attacks(self, attacks: List[Attack]):
+        attacks = list(attacks)
+        super().add_attacks(attacks)
+        for att in attacks:
+            self._base_mat[self._index[att[0]], self._index[att[1]]] = 1
+
+    def set_attack_matrix(self, mat: np.ndarray):
+        super().set_attack_matrix(mat)
+        self._base_mat = self._mat.copy()
+
+    def remove_attack(self, attack: Attack):
+        super().remove_attack(attack)
+        self._base_mat[self._index[attack[0]], self._index[attack[1]]] = 0
+
+    def remove_arguments(self, arguments: List[str]):
+        arguments = set(arguments)
+        n = len(self.args)
+        keep = np.array([arg not in arguments for arg in self.args])
+        super().remove_arguments(arguments)
+        self._base_mat = self._base_mat[:n, :n][keep][:, keep]
+
+class CompiledVAF:
+    """Index-based inference engine compiled from a VAF.
+
+    Answers which argument of the VSAF induced by a set of valid arguments is in its grounded extension,
+    without copying the VAF.
+    Answers are memoised by the bitmask of the valid arguments.
+    """
+    def __init__(self, vaf: ValuebasedArgumentationFramework):
+        """Compile the VAF.
+        Args:
+            vaf (ValuebasedArgumentationFramework): the VAF, with the attacks already filtered by the order.
+        """
+        self.args = list(vaf.args)
+        self.index = {arg: i for i, arg in enumerate(self.args)}
+        self.mat = vaf.mat.astype(bool)
+        self._winners = {}
+
+    def bitmask(self, valid_args: List[str]) -> int:
+        """Encodes a set of arguments as an integer with the bits of their indices set."""
+        mask = 0
+        for arg in valid_args:
+            mask |= 1 << self.index[arg]
+        return mask
+
+    def winner(self, valid_args: List[str]):
+        """Returns the first argument (in the order of `args`) of the extension of the VSAF, or None if it is empty.
+        Args:
+            valid_args (List[str]): arguments that hold in the current situation.
+        """
+        return self.winner_of_bitmask(self.bitmask(valid_args))
+
+    def winner_of_bitmask(self, key: int):
+        """Same as `winner`, with the valid arguments given as a bitmask (see `bitmask`)."""
+        if key not in self._winners:
+            self._winners[key] = self._compute_winner(key)
+        return self._winners[key]
+
+    def _compute_winner(self, key: int):
+        valid = np.flatnonzero([key >> i & 1 for i in range(len(self.args))])
+        # Grounded extension of the VSAF, i.e., of the attacks among the valid arguments.
+        ext = valid[BitsetAF(self.mat[np.ix_(valid, valid)]).grounded()]
+        if len(ext) == 0:
+            return None
+        return self.args[ext[0]]
@@ -0,0 +1,139 @@
+import numpy as np
+from typing import List
+
+# Bits per word of the packed bitsets.
+WORD = 64
+
+
+def n_words(n: int) -> int:
+    return (n + WORD - 1) // WORD
+
+
+def pack(mask: np.ndarray) -> np.ndarray:
+    """Packs the last axis of a Boolean array into bitsets of 64-bit words (bit i of a row is element i).
+
+    Args:
+        mask (np.ndarray): Boolean array of shape (..., n).
+
+    Returns:
+        np.ndarray: array of shape (..., ceil(n/64)) and dtype uint64.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    n = mask.shape[-1]
+    padded = np.zeros((*mask.shape[:-1], n_words(n) * WORD), dtype=bool)
+    padded[..., :n] = mask
+    packed = np.packbits(padded, axis=-1, bitorder='little')
+    return packed.view('<u8').astype(np.uint64)
+
+
+def unpack(bits: np.ndarray, n: int) -> np.ndarray:
+    """Inverse of `pack`: returns the first n elements of each bitset as a Boolean array."""
+    bits = np.ascontiguousarray(bits, dtype='<u8')
+    unpacked = np.unpackbits(bits.view(np.uint8), axis=-1, bitorder='little')
+    return unpacked[..., :n].astype(bool)
+
+
+class BitsetAF:
+    """An AF whose attack relation is stored as packed bitsets, to compute its semantics on thousands of arguments.
+
+    Extensions are given as Boolean vectors indexed as the arguments of the AF.
+    """
+    def __init__(self, mat: np.ndarray):
+        """Initialise the bitsets from an attack matrix.
+        Args:
+            mat (np.ndarray): NxN matrix, where mat[attacker, attacked] = 1.
+        """
+        mat = np.asarray(mat, dtype=bool)
+        self.n = len(mat)
+        # Row a of `attacks` holds the arguments attacked by a, and row a of `attackers` the arguments that attack a.
+        self.attacks = pack(mat)
+        self.attackers = pack(mat.T)
+
+    @classmethod
+    def from_edges(cls, n: int, attackers: np.ndarray, attacked: np.ndarray) -> "BitsetAF":
+        """Builds the bitsets directly from lists of attacks, without a dense NxN matrix.
+        Args:
+            n (int): number of arguments.
+            attackers (np.ndarray): index of the attacker of each attack.
+            attacked (np.ndarray): index of the attacked argument of each attack.
+        """
+        attackers = np.asarray(attackers, dtype=np.int64)
+        attacked = np.asarray(attacked, dtype=np.int64)
+        af = cls.__new__(cls)
+        af.n = n
+        af.attacks = cls._set_bits(n, attackers, attacked)
+        af.attackers = cls._set_bits(n, attacked, attackers)
+        return af
+
+    @staticmethod
+    def _set_bits(n: int, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        bits = np.zeros((n, n_words(n)), dtype=np.uint64)
+        np.bitwise_or.at(bits, (rows, cols // WORD), np.left_shift(np.uint64(1), (cols % WORD).astype(np.uint64)))
+        return bits
+
+    def attacked_by(self, ext: np.ndarray) -> np.ndarray:
+        """Returns the bitset of the arguments attacked by the extension."""
+        rows = self.attacks[np.asarray(ext, dtype=bool)]
+        if len(rows) == 0:
+            return np.zeros(n_words(self.n), dtype=np.uint64)
+        return np.bitwise_or.reduce(rows, axis=0)
+
+    def grounded(self) -> np.ndarray:
+        """Computes the grounded extension as the least fixpoint of the characteristic function.
+
+        An argument is IN when all its attackers are OUT, and it is OUT when it is attacked by an argument that is IN.
+        Only the undecided arguments are tested at each iteration, and the OUT bitset grows with the new IN arguments.
+
+        Returns:
+            np.ndarray: Boolean vector with the arguments in the grounded extension.
+        """
+        ext = np.zeros(self.n, dtype=bool)
+        out = np.zeros(n_words(self.n), dtype=np.uint64)
+        undecided = np.arange(self.n)
+        while len(undecided) > 0:
+            # Undecided arguments whose attackers are all OUT.
+            accepted = ~np.any(self.attackers[undecided] & ~out, axis=1)
+            new_in = undecided[accepted]
+            if len(new_in) == 0:
+                break
+            ext[new_in] = True
+            out |= np.bitwise_or.reduce(self.attacks[new_in], axis=0)
+            defeated = unpack(out, self.n)
+            undecided = undecided[~accepted & ~defeated[undecided]]
+        return ext
+
+    def is_conflict_free(self, ext: np.ndarray) -> bool:
+        return not np.any(self.attacked_by(ext) & pack(ext))
+
+    def is_admissible(self, ext: np.ndarray) -> bool:
+        """Conflict-free and every argument in the extension is defended by it."""
+        if not self.is_conflict_free(ext):
+            return False
+        defeated = self.attacked_by(ext)
+        return not np.any(self.attackers[np.asarray(ext, dtype=bool)] & ~defeated)
+
+    def is_complete(self, ext: np.ndarray) -> bool:
+        """Admissible and it contains every argument it defends."""
+        if not self.is_admissible(ext):
+            return False
+        defended = ~np.any(self.attackers & ~self.attacked_by(ext), axis=1)
+        return not np.any(defended & ~np.asarray(ext, dtype=bool))
+
+    def is_stable(self, ext: np.ndarray) -> bool:
+        """Conflict-free and it attacks every argument outside of it."""
+        if not self.is_conflict_free(ext):
+            return False
+        outside = ~np.asarray(ext, dtype=bool)
+        return bool(np.all(unpack(self.attacked_by(ext), self.n)[outside]))
+
+
+def grounded_extension(args: List[str], mat: np.ndarray) -> List[str]:
+    """Returns the grounded extension of an AF.
+    Args:
+        args (List[str]): arguments of the AF.
+        mat (np.ndarray): attack matrix of the AF, indexed as `args`.
+    Returns:
+        List[str]: arguments in the grounded extension (in the order of `args`).
+    """
+    ext = BitsetAF(mat).grounded()
+    return [arg for arg, accepted in zip(args, ext) if accepted]
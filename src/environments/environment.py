@@ -1,11 +1,11 @@
 from abc import ABC, abstractmethod
 from argumentation import utils as argm
-from argumentation.classes import ValuebasedArgumentationFramework
+from argumentation.classes import CompiledVAF, ValuebasedArgumentationFramework
+from argumentation.semantics import grounded_extension
+from environments.return_cache import ReturnCache
 from copy import deepcopy
-import numpy as np
 import random
-import time
-from typing import Dict, List
+from typing import Dict, Hashable, List, Optional
 
 class Environment(ABC):
     """Interface that ORLA uses to play a game and obtain the reward.
@@ -22,6 +22,26 @@ class Environment(ABC):
 
         self._arguments = list(arg_actions.keys())
         self._attacks = argm.construct_all_attacks(arg_actions)
+        # The VAF is built once and re-ordered with the ranking of every episode.
+        self._vaf = ValuebasedArgumentationFramework(self._arguments, self._attacks, update_on_init=False)
+        self._return_cache: Optional[ReturnCache] = None
+
+    def enable_return_cache(self, max_nodes: int = 100000):
+        """Caches the returns of the episodes, so that rankings that induce the same policy are only played once.
+        Only valid if the game is deterministic given `episode_key` (see `ReturnCache`). Episodes where
+        an action is chosen at random (because no argument is acceptable) are never cached.
+        Args:
+            max_nodes (int, optional): maximum size of the cache. Defaults to 100000.
+        """
+        self._return_cache = ReturnCache(max_nodes)
+
+    def seed(self, seed: int):
+        """Seeds the random state from which the environment draws the initial state of the episodes (if any)."""
+        pass
+
+    def episode_key(self) -> Hashable:
+        """Identifies the initial state of the episode that has just been reset (e.g., the map), for the return cache."""
+        return None
 
     @abstractmethod
     def get_premises(self, obs):
@@ -39,6 +59,13 @@ class Environment(ABC):
     def reset_memory(self):
         self.mem = NotImplemented
 
+    def reset(self):
+        """Resets the game for a new episode.
+        Returns:
+            the first observation and the info of the game.
+        """
+        return self._env.reset()
+
     def play(self, ranking: argm.Ranking) -> float:
         """Uses the ranking to play the RL game and returns the total reward.
 
@@ -48,31 +75,53 @@ class Environment(ABC):
         Returns:
             float: total reward emitted by the environment at the end of the task
         """
-        vaf = ValuebasedArgumentationFramework(self._arguments, self._attacks, ranking)
-        observation, _ = self._env.reset()
+        self._vaf.reorder(ranking)
+        engine = CompiledVAF(self._vaf)
+        observation, _ = self.reset()
         self.reset_memory()
+
+        trajectory = None
+        if self._return_cache is not None:
+            key = self.episode_key()
+            total_reward = self._return_cache.lookup(key, lambda mask: self._winner_action(engine, mask))
+            if total_reward is not None:
+                return total_reward
+            trajectory = []
+
         total_reward = 0
         terminated = False
         truncated = False
         while not (terminated or truncated):
-            action = self.select_action(vaf, observation)
+            action = self.select_action(engine, observation, trajectory)
             self.update_memory(observation, action)
             observation, reward, terminated, truncated, _ = self._env.step(action)
 
             total_reward += reward
+        if trajectory is not None and None not in trajectory:
+            self._return_cache.insert(key, trajectory, total_reward)
         return total_reward
 
-    def select_action(self, vaf, obs) ->int:
+    def select_action(self, engine: CompiledVAF, obs, trajectory: Optional[list] = None) ->int:
         """Select an action according to the VAF it has been initialised with.
         Args:
+            engine (CompiledVAF): the VAF compiled for inference.
             obs (_type_): observation of the game.
+            trajectory (Optional[list], optional): if given, the (bitmask of the valid arguments, action) pair
+                is appended to it, or None if the action is random. Defaults to None.
         Returns:
             int: index of the selected action.
         """
-        vsaf = self.get_vsaf(vaf, obs)
-        ext = self.get_extension(vsaf)
-        action = self.get_extension_action(ext)
+        prems = self.get_premises(obs)
+        valid_args = self.get_arguments(prems)
+        winner = engine.winner(valid_args)
+        action = self.get_extension_action([] if winner is None else [winner])
+        if trajectory is not None:
+            trajectory.append(None if winner is None else (engine.bitmask(valid_args), action))
         return action
+
+    def _winner_action(self, engine: CompiledVAF, mask: int) -> Optional[int]:
+        winner = engine.winner_of_bitmask(mask)
+        return None if winner is None else self._arg_actions[winner]
     
     def get_vsaf(self, vaf, obs) -> ValuebasedArgumentationFramework:
         """Get the value-based situation-specific argumentation framework (VSAF) given the current observation of the game.
@@ -90,16 +139,13 @@ class Environment(ABC):
     
     @staticmethod
     def get_extension(vsaf: ValuebasedArgumentationFramework):
-        """Returns the grounded extension. In a total strict order (such as as ours), the grounded extension contains always one argument.
+        """Returns the grounded extension. In a total strict order (such as as ours), all the arguments in the grounded extension promote the same action.
         Args:
             vsaf (ValuebasedArgumentationFramework): the VSAF given the current observation of the game.
         Returns:
             _type_: arguments in the grounded extension.
         """
-        sum_cols = vsaf.mat.sum(axis=0)
-        indices = np.nonzero(sum_cols==0)
-        ext = np.take(vsaf.args, indices)[0]
-        return ext
+        return grounded_extension(vsaf.args, vsaf.mat)
     
 
     def get_extension_action(self, ext: list) -> int:
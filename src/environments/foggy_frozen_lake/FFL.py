@@ -2,56 +2,94 @@ import gymnasium as gym
 from gymnasium.envs.toy_text.frozen_lake  import generate_random_map
 
 import numpy as np
-from copy import deepcopy
+from typing import Optional
 
 from environments.foggy_frozen_lake.utils import FLActions
 from environments.environment import Environment
 from environments.foggy_frozen_lake.utils import Direction
 
 from environments.foggy_frozen_lake.world import FrozenLakeWrapper, FrozenLakeRewardWrapper, FrozenLakeNeighboursObservationWrapper
+from environments.foggy_frozen_lake.map_bank import MapBank
 
 class FFL(Environment):
-    def __init__(self, arg_actions, n=8, p=0.8, render=False):
+    def __init__(self, arg_actions, n=8, p=0.8, render=False, maps: Optional[MapBank] = None, rng: Optional[np.random.Generator] = None, compact_obs: bool = False, fresh_maps: bool = False):
+        """Initialise the game.
+        Args:
+            arg_actions: dictionary in the format {argument: action}.
+            n (int, optional): map size. Defaults to 8.
+            p (float, optional): probability of a tile being frozen. Defaults to 0.8.
+            render (bool, optional): whether to render the game. Defaults to False.
+            maps (Optional[MapBank], optional): bank from which a new map is drawn on every reset.
+                Defaults to None (the same random map is used for all episodes).
+            rng (Optional[np.random.Generator], optional): generator of the maps, drawn from the bank or at random
+                (see `seed`). Defaults to None (a new generator, seeded from fresh entropy).
+            compact_obs (bool, optional): whether observations are the compact [tile index, neighbours bitfield]
+                encoding of `FrozenLakeNeighboursObservationWrapper`. Defaults to False.
+            fresh_maps (bool, optional): whether to draw a new random map of size n on every reset (as if a new
+                FFL was created for every episode). Ignored if `maps` is given. Defaults to False.
+        """
         render_mode = "human" if render else None
-        env = gym.make("FrozenLake-v1",  is_slippery=False, desc=generate_random_map(n, p), render_mode = render_mode)
+        self.maps = maps
+        self._rng = rng if rng is not None else np.random.default_rng()
+        self.fresh_maps = fresh_maps
+        desc = self.random_map(n, p) if maps is None else maps[maps.sample_indices(rng=self._rng)]
+        env = gym.make("FrozenLake-v1",  is_slippery=False, desc=desc, render_mode = render_mode)
         env = FrozenLakeWrapper(env, multiple_visits=True)
-        env = FrozenLakeNeighboursObservationWrapper(env)
+        env = FrozenLakeNeighboursObservationWrapper(env, compact=compact_obs)
         env = FrozenLakeRewardWrapper(env)
         super().__init__(arg_actions, env)
-        self.n = n
+        self.n = n if maps is None else maps.n
         self.p = p
         self.reset_memory()
 
+    def reset(self, desc=None):
+        """Resets the game, optionally on a new map.
+        Args:
+            desc (optional): map of the new episode, in the format of `generate_random_map`. Defaults to a map drawn
+                from the bank (if any), a new random map (if `fresh_maps`), or to the current map.
+        """
+        if desc is None and self.maps is not None:
+            desc = self.maps[self.maps.sample_indices(rng=self._rng)]
+        elif desc is None and self.fresh_maps:
+            desc = self.random_map(self.n, self.p)
+        if desc is None:
+            return self._env.reset()
+        self.n = len(desc)
+        return self._env.reset(options={'desc': desc})
+
+    def seed(self, seed: int):
+        """Reseeds the generator of the maps, so that the maps of the next episodes are reproducible."""
+        self._rng = np.random.default_rng(seed)
+
+    def random_map(self, n: int, p: float):
+        """Random map, seeded from the generator of the environment (not from the global NumPy random state)."""
+        return generate_random_map(n, p, seed=int(self._rng.integers(2**31)))
+
+    def episode_key(self):
+        # Episodes are deterministic given the map.
+        return self._env.unwrapped.desc.tobytes()
+
     def get_premises(self, observation):
         # Extract relevant vectors for convenience.
-        safe = observation[0:8]
-        holes = observation[0:16]
-        margin = observation[16:24]
-
-        # Get the tile index.
-        tile_idx = np.where(observation[24:])[0][0]
-        # Get the map size.
-        map_size = int(np.sqrt(len(observation)-24))
-
-        # Pad memory and convert to a 3D array for convenience.
-        memory_pad = deepcopy(self.memory)
-        memory_pad = memory_pad.reshape(map_size, map_size, 4)
-        memory_pad = np.pad(memory_pad, pad_width=((1,1), (1,1), (0,0)))
-        
-        # Get the coordinates of the current tile in the padded memory.
-        row, col = np.unravel_index(tile_idx, (map_size, map_size))
-        tile_idx = (row+1)*(map_size+2) + col + 1
-        row, col = np.unravel_index(tile_idx, (map_size+2, map_size+2))
+        if len(observation) == 2:
+            # Compact observation: the safe neighbours are the lowest 8 bits.
+            safe = [observation[1] >> i & 1 == 1 for i in range(8)]
+        else:
+            safe = observation[0:8]
+
+        # Get the tile index and its neighbours in the padded memory.
+        tile_idx = self.get_tile(observation)
+        neighbours = self._neighbours[tile_idx]
 
         safe_up = safe[Direction.TOP]
         safe_down = safe[Direction.BOTTOM]
         safe_left = safe[Direction.LEFT]
         safe_right = safe[Direction.RIGHT]
 
-        visited_up = any(memory_pad[row-1, col])
-        visited_down = any(memory_pad[row+1, col])
-        visited_left = any(memory_pad[row, col-1])
-        visited_right = any(memory_pad[row, col+1])
+        visited_up = self._visited[neighbours[Direction.TOP]]
+        visited_down = self._visited[neighbours[Direction.BOTTOM]]
+        visited_left = self._visited[neighbours[Direction.LEFT]]
+        visited_right = self._visited[neighbours[Direction.RIGHT]]
 
         res = {
             'safe_up'    : safe_up,
@@ -88,14 +126,40 @@ class FFL(Environment):
 
         return args
     
+    def get_tile(self, observation) -> int:
+        """Index of the current tile, i.e., the position that the FrozenLake environment tracks, rather than the
+        one-hot tail of the full observation (which would take O(n^2) to search).
+        Args:
+            observation: current observation of the game.
+        """
+        return int(self._env.unwrapped.s)
+
     def update_memory(self, obs, act):
         # Make memory[tile_index][action] = True, 
         # to remember what actions were aready taken in the current tile.
-        self.memory[obs[24:]==True, act] = True
+        tile_idx = self.get_tile(obs)
+        self.memory[tile_idx, act] = True
+        self._visited[self._padded[tile_idx]] = True
     
     def reset_memory(self):
         # We want an array where for each tile, we can store what actions we took.
         # There are map_size x map_size x #actions bits to store.
         # Table format is chosen because map tiles are identified by tile index.
+        if getattr(self, 'memory', None) is not None and len(self.memory) == self.n*self.n:
+            self.memory.fill(False)
+            self._visited.fill(False)
+            return
         self.memory = np.zeros((self.n*self.n, len(FLActions)), dtype=bool)
+        # Whether any action was taken in each tile, on a map padded with a margin of never visited tiles,
+        # so that the neighbours of any tile can be read without bound checks.
+        self._visited = np.zeros((self.n+2)*(self.n+2), dtype=bool)
+        row, col = np.divmod(np.arange(self.n*self.n), self.n)
+        self._padded = (row+1)*(self.n+2) + col + 1
+        # Index in the padded memory of the neighbours of each tile, indexed by `Direction`.
+        offsets = np.zeros(8, dtype=int)
+        offsets[Direction.LEFT] = -1
+        offsets[Direction.RIGHT] = 1
+        offsets[Direction.TOP] = -(self.n+2)
+        offsets[Direction.BOTTOM] = self.n+2
+        self._neighbours = (self._padded[:, None] + offsets[None, :]).tolist()
 
@@ -0,0 +1,61 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+from gymnasium.envs.toy_text.frozen_lake import generate_random_map
+
+
+class MapBank:
+    """Pregenerated valid Frozen Lake maps, stored as a memory-mapped (N, n, n) array of characters.
+
+    Maps are generated with `generate_random_map` from consecutive seeds, so a bank is reproducible from (n, p, size, seed).
+    """
+    def __init__(self, path: str):
+        """Open an existing bank.
+        Args:
+            path (str): path of the .npy file of the bank.
+        """
+        self.path = path
+        self.maps = np.load(path, mmap_mode='r')
+        self.n = self.maps.shape[1]
+
+    @classmethod
+    def generate(cls, path: str, n: int = 8, p: float = 0.8, size: int = 10000, seed: int = 0) -> "MapBank":
+        """Generates `size` valid n x n maps and stores them in `path`."""
+        maps = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(size, n, n))
+        for i in range(size):
+            desc = generate_random_map(n, p, seed=seed+i)
+            maps[i] = np.frombuffer("".join(desc).encode(), dtype=np.uint8).reshape(n, n)
+        maps.flush()
+        del maps
+        return cls(path)
+
+    @classmethod
+    def load_or_generate(cls, directory: str, n: int = 8, p: float = 0.8, size: int = 10000, seed: int = 0) -> "MapBank":
+        """Opens the bank for (n, p, size, seed) in `directory`, generating it the first time."""
+        path = os.path.join(directory, "maps_{}x{}_p{}_N{}_seed{}.npy".format(n, n, p, size, seed))
+        if os.path.exists(path):
+            return cls(path)
+        os.makedirs(directory, exist_ok=True)
+        # Generate under a temporary name, so that an interrupted generation is never loaded.
+        tmp_path = path[:-len(".npy")] + ".tmp.npy"
+        cls.generate(tmp_path, n, p, size, seed)
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self.maps)
+
+    def __getitem__(self, index: int) -> List[str]:
+        """Returns the map in the format of `generate_random_map`."""
+        return [row.tobytes().decode() for row in self.maps[index]]
+
+    def descs(self, indices: np.ndarray) -> np.ndarray:
+        """Returns several maps as a (k, n, n) array of characters (as accepted by `VectorFFL`)."""
+        return np.asarray(self.maps[np.asarray(indices)]).view('S1')
+
+    def sample_indices(self, k: Optional[int] = None, rng: Optional[np.random.Generator] = None):
+        """Draws map indices uniformly at random. Uses the global NumPy random state if no generator is given."""
+        if rng is None:
+            return np.random.randint(len(self), size=k)
+        return rng.integers(len(self), size=k)
@@ -0,0 +1,223 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from gymnasium.envs.toy_text.frozen_lake import generate_random_map
+
+from argumentation import utils as argm
+from argumentation.classes import ValuebasedArgumentationFramework
+from environments.foggy_frozen_lake.utils import FLActions
+
+# Tile categories of the padded maps.
+MARGIN = 0
+SAFE   = 1
+HOLE   = 2
+GOAL   = 3
+
+# Direction (of the neighbour it refers to) and whether it needs the neighbour not to be visited, per FFL argument.
+argument_premises = {
+    'U' : ('up', False),
+    'D' : ('down', False),
+    'L' : ('left', False),
+    'R' : ('right', False),
+    'nU': ('up', True),
+    'nD': ('down', True),
+    'nL': ('left', True),
+    'nR': ('right', True),
+}
+
+# Action that moves towards each neighbour, and the (row, column) offset of the neighbour.
+directions = {
+    'left' : (FLActions.LEFT, 0, -1),
+    'down' : (FLActions.DOWN, 1, 0),
+    'right': (FLActions.RIGHT, 0, 1),
+    'up'   : (FLActions.UP, -1, 0),
+}
+
+
+def encode_maps(maps) -> np.ndarray:
+    """Encodes maps (as generated by `generate_random_map`) into padded arrays of tile categories.
+    Args:
+        maps: K maps, each one a list of strings or an array of characters.
+    Returns:
+        np.ndarray: (K, n+2, n+2) array of tile categories, with a margin around each map.
+    """
+    maps = np.array([np.asarray(desc, dtype='c') for desc in maps])
+    codes = np.full((maps.shape[0], maps.shape[1]+2, maps.shape[2]+2), MARGIN, dtype=np.int8)
+    inner = codes[:, 1:-1, 1:-1]
+    inner[np.isin(maps, [b'S', b'F'])] = SAFE
+    inner[maps == b'H'] = HOLE
+    inner[maps == b'G'] = GOAL
+    return codes
+
+
+class VectorFFL:
+    """Foggy Frozen Lake on K maps stepped in lockstep with NumPy.
+
+    Equivalent to K instances of `FFL` (non-slippery FrozenLake-v1 with `FrozenLakeWrapper`,
+    `FrozenLakeNeighboursObservationWrapper` and `FrozenLakeRewardWrapper`), including the truncation
+    of episodes that loop between two tiles and the time limit of FrozenLake-v1.
+    """
+    def __init__(self, arg_actions: Dict, max_episode_steps: int = 100, seed: Optional[int] = None):
+        """Initialise the environment.
+        Args:
+            arg_actions (Dict): dictionary in the format {argument: action}. Arguments must be FFL arguments (see `argument_premises`).
+            max_episode_steps (int, optional): time limit of an episode. Defaults to 100 (as FrozenLake-v1).
+            seed (Optional[int], optional): seed of the random actions taken when no argument is acceptable. Defaults to None.
+        """
+        self._arg_actions = arg_actions
+        self._arguments = list(arg_actions.keys())
+        self._actions = np.array([arg_actions[arg] for arg in self._arguments])
+        self._vaf = ValuebasedArgumentationFramework(
+            self._arguments, argm.construct_all_attacks(arg_actions), update_on_init=False)
+        self.max_episode_steps = max_episode_steps
+        self.rng = np.random.default_rng(seed)
+
+        # Subsets of arguments are encoded as integers: argument i is in the subset if bit i is set.
+        self._bits = 1 << np.arange(len(self._arguments))
+
+    def reset(self, maps):
+        """Starts K episodes, one on each map.
+        Args:
+            maps: K maps of the same size, each one a list of strings or an array of characters.
+        """
+        self.codes = encode_maps(maps)
+        self.k, self.width = self.codes.shape[0], self.codes.shape[2]
+        self.flat = self.codes.reshape(self.k, -1)
+        self._envs = np.arange(self.k)
+        # Offset of the position for each action.
+        self._moves = np.zeros(len(FLActions), dtype=int)
+        for direction, (action, _, _) in directions.items():
+            self._moves[action] = self._offset(direction)
+        # Positions are indices in the padded maps.
+        self.pos = np.argmax(np.array([np.asarray(desc, dtype='c') for desc in maps]).reshape(self.k, -1) == b'S', axis=1)
+        self.pos = self._to_padded(self.pos)
+        self.visited = np.zeros_like(self.flat, dtype=bool)
+        self.t = np.zeros(self.k, dtype=int)
+        self.elapsed = np.zeros(self.k, dtype=int)
+        # The last 6 positions of each episode, to detect loops.
+        self.hist = np.zeros((self.k, 6), dtype=int)
+        self.total_reward = np.zeros(self.k)
+        self.done = np.zeros(self.k, dtype=bool)
+
+    def _to_padded(self, index: np.ndarray) -> np.ndarray:
+        n = self.width - 2
+        row, col = np.divmod(index, n)
+        return (row+1)*self.width + col + 1
+
+    def _offset(self, direction: str) -> int:
+        _, d_row, d_col = directions[direction]
+        return d_row*self.width + d_col
+
+    def premises(self) -> Dict[str, np.ndarray]:
+        """Premises of every episode, as (K,) Boolean arrays (see `FFL.get_premises`)."""
+        res = dict()
+        for direction in directions:
+            neighbour = self.pos + self._offset(direction)
+            tile = self.flat[self._envs, neighbour]
+            res['safe_' + direction] = (tile == SAFE) | (tile == GOAL)
+            res['visited_' + direction] = self.visited[self._envs, neighbour]
+        return res
+
+    def arguments(self, premises: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        """(K, m) Boolean array with the arguments that hold in every episode (see `FFL.get_arguments`)."""
+        if premises is None:
+            premises = self.premises()
+        valid = np.zeros((self.k, len(self._arguments)), dtype=bool)
+        for i_arg, arg in enumerate(self._arguments):
+            direction, not_visited = argument_premises[arg]
+            valid[:, i_arg] = premises['safe_' + direction]
+            if not_visited:
+                valid[:, i_arg] &= ~premises['visited_' + direction]
+        return valid
+
+    def action_tables(self, rankings: List[argm.Ranking]) -> np.ndarray:
+        """Compiles each ranking into the action it selects for every subset of valid arguments.
+
+        Returns:
+            np.ndarray: (K, 2^m) array with the action promoted by the grounded extension of the VSAF, or -1 if it is empty.
+        """
+        m = len(self._arguments)
+        mats = []
+        for ranking in rankings:
+            self._vaf.reorder(ranking)
+            mats.append(self._vaf.mat.astype(bool))
+        mats = np.array(mats)
+        # Attacks as bitsets: bit b of attacks[k, a] is set if a attacks b, and bit b of attackers[k, a] if b attacks a.
+        attacks = (mats @ self._bits)[:, :, None]
+        attackers = (mats.transpose(0, 2, 1) @ self._bits)[:, :, None]
+        subsets = np.arange(2**m)[None]
+        # Grounded extension of every VSAF, as the least fixpoint of the characteristic function.
+        ext = np.zeros((len(rankings), 2**m), dtype=int)
+        while True:
+            out = np.zeros_like(ext)
+            for a in range(m):
+                out |= np.where(ext >> a & 1, attacks[:, a], 0)
+            new_ext = np.zeros_like(ext)
+            for a in range(m):
+                accepted = (subsets >> a & 1).astype(bool) & (attackers[:, a] & subsets & ~out == 0)
+                new_ext |= accepted << a
+            if np.array_equal(new_ext, ext):
+                break
+            ext = new_ext
+        # The first argument of the extension decides the action.
+        winner = np.argmax(ext[..., None] >> np.arange(m) & 1, axis=-1)
+        return np.where(ext > 0, self._actions[winner], -1)
+
+    def select_actions(self, tables: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        actions = tables[self._envs, valid @ self._bits]
+        no_extension = actions == -1
+        if np.any(no_extension):
+            actions[no_extension] = self.rng.choice(np.sort(self._actions), no_extension.sum())
+        return actions
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Takes one action in every episode that is not done.
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: rewards, terminated and truncated, as (K,) arrays.
+        """
+        active = ~self.done
+        # Memory of the tiles where an action was taken.
+        self.visited[self._envs[active], self.pos[active]] = True
+
+        # Truncate the episodes that keep going back and forth between two tiles (see `FrozenLakeWrapper.step`).
+        self.hist[active, self.t[active] % 6] = self.pos[active]
+        self.t[active] += 1
+        last = self.hist[self._envs[:, None], (self.t[:, None] + np.arange(6)) % 6]
+        looping = active & (self.t >= 6) & np.all(last[:, :4] == last[:, 2:], axis=1)
+        moving = active & ~looping
+
+        target = self.pos + self._moves[np.where(moving, actions, 0)]
+        # Moving out of the map leaves the agent where it is.
+        move = moving & (self.flat[self._envs, target] != MARGIN)
+        self.pos[move] = target[move]
+        self.elapsed[moving] += 1
+
+        tile = self.flat[self._envs, self.pos]
+        rewards = np.zeros(self.k)
+        rewards[moving & (tile == HOLE)] = -1
+        rewards[moving & (tile == GOAL)] = 1
+        terminated = moving & ((tile == HOLE) | (tile == GOAL))
+        truncated = looping | (moving & (self.elapsed >= self.max_episode_steps))
+
+        self.total_reward += rewards
+        self.done |= terminated | truncated
+        return rewards, terminated, truncated
+
+    def play(self, rankings: List[argm.Ranking], maps) -> np.ndarray:
+        """Plays one episode per ranking, ranking k on map k, and returns the total rewards.
+        Args:
+            rankings (List[argm.Ranking]): K rankings.
+            maps: K maps of the same size.
+        Returns:
+            np.ndarray: (K,) total rewards.
+        """
+        self.reset(maps)
+        tables = self.action_tables(rankings)
+        while not np.all(self.done):
+            actions = self.select_actions(tables, self.arguments())
+            self.step(actions)
+        return self.total_reward
+
+    @staticmethod
+    def random_maps(k: int, n: int = 8, p: float = 0.8) -> List[List[str]]:
+        return [generate_random_map(n, p) for _ in range(k)]
@@ -2,17 +2,46 @@ import numpy as np
 import gymnasium as gym
 from environments.foggy_frozen_lake.utils import FLActions
 
+class FrozenLakeTransitions(dict):
+    """Transition table P of a non-slippery FrozenLakeEnv, built lazily for the states that are actually visited.
+    """
+    # Offsets (row, column) of each action.
+    moves = {FLActions.LEFT: (0, -1), FLActions.DOWN: (1, 0), FLActions.RIGHT: (0, 1), FLActions.UP: (-1, 0)}
+
+    def __init__(self, desc: np.ndarray):
+        super().__init__()
+        self.desc = desc
+        self.nrow, self.ncol = desc.shape
+
+    def __missing__(self, s: int):
+        row, col = divmod(s, self.ncol)
+        transitions = {}
+        for a, (d_row, d_col) in self.moves.items():
+            if self.desc[row, col] in b"GH":
+                transitions[a] = [(1.0, s, 0, True)]
+                continue
+            new_row = min(max(row + d_row, 0), self.nrow - 1)
+            new_col = min(max(col + d_col, 0), self.ncol - 1)
+            letter = self.desc[new_row, new_col]
+            transitions[a] = [(1.0, new_row * self.ncol + new_col, float(letter == b"G"), bytes(letter) in b"GH")]
+        self[s] = transitions
+        return transitions
+
+
 class FrozenLakeWrapper(gym.Wrapper):
     def __init__(self, env: gym.Env, multiple_visits = True):
         super().__init__(env)
         self.t = 0
         self.multiple_visits = multiple_visits
         self.previous_actions = np.full([*env.desc.shape, len(FLActions)], 0)
-        self.hist = []
+        # Ring buffer with the last 6 states where an action was taken (the state of step t is at (t-1) % 6).
+        self.hist = [None] * 6
     def step(self, action):
         self.t +=1
-        self.hist.append(self.s)
-        if self.hist[-2:] == self.hist[-4:-2] == self.hist[-6:-4]:
+        self.hist[(self.t - 1) % 6] = self.s
+        # The last 6 states alternate between two tiles iff the even slots and the odd slots of the ring are equal,
+        # whatever the position of the last state in the ring.
+        if self.t >= 6 and self.hist[0] == self.hist[2] == self.hist[4] and self.hist[1] == self.hist[3] == self.hist[5]:
             return self.s, 0, False, True, self.t
 
         if not self.multiple_visits and self.previous_actions[self.coordinates][action] == 1:
@@ -23,10 +52,30 @@ class FrozenLakeWrapper(gym.Wrapper):
         info['t'] = self.t
         return next_state, reward, terminated, truncated, info
     def reset(self, **kwargs):
+        options = kwargs.get('options') or {}
+        if 'desc' in options:
+            self.set_map(options['desc'])
         self.t = 0
-        self.previous_actions = np.full([*self.env.desc.shape, len(FLActions)], 0)
-        self.hist = []
+        shape = (*self.env.desc.shape, len(FLActions))
+        if self.previous_actions.shape == shape:
+            self.previous_actions.fill(0)
+        else:
+            self.previous_actions = np.full(shape, 0)
         return super().reset(**kwargs)
+
+    def set_map(self, desc):
+        """Replaces the map of the (non-slippery) FrozenLake environment, without creating a new one.
+        Args:
+            desc: new map, in the format of `generate_random_map`.
+        """
+        env = self.unwrapped
+        env.desc = desc = np.asarray(desc, dtype="c")
+        env.nrow, env.ncol = nrow, ncol = desc.shape
+        env.initial_state_distrib = np.array(desc == b"S").astype("float64").ravel()
+        env.initial_state_distrib /= env.initial_state_distrib.sum()
+        env.observation_space = gym.spaces.Discrete(nrow * ncol)
+        env.P = FrozenLakeTransitions(desc)
+
     def index_to_coordinate(self, index):
         return np.unravel_index(index, (self.nrow, self.ncol))
     @property
@@ -99,11 +148,31 @@ class FrozenLakeMapObservationWrapper(gym.ObservationWrapper):
 
 class FrozenLakeNeighboursObservationWrapper(gym.ObservationWrapper):
     """
-    Includes the neighbours in the observation
+    Includes the neighbours in the observation.
+
+    With `compact=True`, the observation is instead a reused buffer [tile index, neighbours bitfield], where bit i
+    of the bitfield is neighbour i being safe, bit 8+i being a hole and bit 16+i being the margin
+    (i.e., the bits of the first 24 elements of the full observation).
     """
-    def __init__(self, env: gym.Env):
+    def __init__(self, env: gym.Env, compact: bool = False):
         super().__init__(env)
+        self.compact = compact
+        self._buffer = np.zeros(2, dtype=np.int64)
+        self._table_desc = None
+
+    def reset(self, **kwargs):
+        obs, info = self.env.reset(**kwargs)
+        if self.compact and self._table_desc is not self.desc:
+            # The map changed: recompute the neighbours of every tile.
+            self._table = self.get_neighbours_table(self.desc)
+            self._table_desc = self.desc
+        return self.observation(obs), info
+
     def observation(self, obs):
+        if self.compact:
+            self._buffer[0] = self.s
+            self._buffer[1] = self._table[self.s]
+            return self._buffer
         neighbours = self.get_neighbours(self.desc, self.s)
         holes = neighbours == 'H'
         margin = neighbours == '0'
@@ -125,4 +194,25 @@ class FrozenLakeNeighboursObservationWrapper(gym.ObservationWrapper):
         res[1:4] = padded[row-1, col-1:col+2]
         res[4] = padded[row, col+1]
         res[5:9] = np.flip(padded[row+1, col-1:col+2])
-        return res
\ No newline at end of file
+        return res
+
+    # (row, column) offset of each neighbour, in the order of `get_neighbours`.
+    neighbour_offsets = [(0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1)]
+
+    @classmethod
+    def get_neighbours_table(cls, tiles) -> np.ndarray:
+        """Computes the neighbours bitfield of every tile of the map at once.
+        Returns:
+            np.ndarray: (n*n,) array with the bitfield of each tile index.
+        """
+        tiles = np.asarray(tiles, dtype='c')
+        nrow, ncol = tiles.shape
+        padded = np.pad(tiles, 1, constant_values=b'0')
+        table = np.zeros((nrow, ncol), dtype=np.int64)
+        for i, (d_row, d_col) in enumerate(cls.neighbour_offsets):
+            neighbour = padded[1+d_row:1+d_row+nrow, 1+d_col:1+d_col+ncol]
+            safe = np.isin(neighbour, [b'F', b'S', b'G'])
+            table |= safe.astype(np.int64) << i
+            table |= (neighbour == b'H').astype(np.int64) << (8 + i)
+            table |= (neighbour == b'0').astype(np.int64) << (16 + i)
+        return table.ravel()
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Node:
+    """State reached by a sequence of actions: the valid arguments there, and the state reached by each action.
+    Terminal nodes hold the return of the episode instead."""
+    __slots__ = ('mask', 'children', 'total_reward')
+
+    def __init__(self, mask: Optional[int] = None):
+        self.mask = mask
+        self.children: Dict[int, "_Node"] = {}
+        self.total_reward: Optional[float] = None
+
+
+class ReturnCache:
+    """Returns of the episodes played in a deterministic environment, shared by all the rankings that induce the same policy.
+
+    In a deterministic environment, an episode is determined by its initial state (e.g., the map) and the action
+    taken in every situation reached. The cache keeps, for each initial state, a trie of the trajectories played:
+    each node stores the bitmask of the valid arguments in the situation it represents, and has one child per action.
+    A ranking is looked up by following, from the root, the action it selects in each stored situation.
+    Hence, the key of an episode is the fingerprint of the policy on the situations it actually reaches.
+
+    Initial states are evicted in least recently used order when the tries exceed `max_nodes` nodes.
+    """
+    def __init__(self, max_nodes: int = 100000):
+        self.max_nodes = max_nodes
+        self._roots: "OrderedDict[Hashable, Tuple[_Node, int]]" = OrderedDict()
+        self._n_nodes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """Number of nodes in the cache."""
+        return self._n_nodes
+
+    def lookup(self, key: Hashable, policy: Callable[[int], Optional[int]]) -> Optional[float]:
+        """Returns the cached return of the policy from the initial state `key`, or None if it is not cached.
+        Args:
+            key (Hashable): initial state of the episode.
+            policy (Callable[[int], Optional[int]]): action selected for a bitmask of valid arguments
+                (None if it is chosen at random).
+        """
+        if key not in self._roots:
+            self.misses += 1
+            return None
+        self._roots.move_to_end(key)
+        node, _ = self._roots[key]
+        while node.total_reward is None:
+            action = policy(node.mask)
+            node = node.children.get(action) if action is not None else None
+            if node is None:
+                self.misses += 1
+                return None
+        self.hits += 1
+        return node.total_reward
+
+    def insert(self, key: Hashable, trajectory: List[Tuple[int, int]], total_reward: float):
+        """Stores the return of an episode.
+        Args:
+            key (Hashable): initial state of the episode.
+            trajectory (List[Tuple[int, int]]): bitmask of the valid arguments and action taken, at every step.
+            total_reward (float): return of the episode.
+        """
+        if key in self._roots:
+            root, size = self._roots[key]
+        else:
+            root, size = _Node(trajectory[0][0] if trajectory else None), 1
+        node = root
+        for i, (_, action) in enumerate(trajectory):
+            if action not in node.children:
+                mask = trajectory[i+1][0] if i+1 < len(trajectory) else None
+                node.children[action] = _Node(mask)
+                size += 1
+            node = node.children[action]
+        node.total_reward = total_reward
+
+        self._n_nodes += size - (self._roots[key][1] if key in self._roots else 0)
+        self._roots[key] = (root, size)
+        self._roots.move_to_end(key)
+        while self._n_nodes > self.max_nodes and self._roots:
+            _, (_, evicted) = self._roots.popitem(last=False)
+            self._n_nodes -= evicted
+
+    def clear(self):
+        self._roots.clear()
+        self._n_nodes = 0
@@ -0,0 +1,86 @@
+import multiprocessing as mp
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from argumentation import utils as argm
+from environments.environment import Environment
+
+# Environment of the current worker process, created once by `_init_worker`.
+_worker_env: Optional[Environment] = None
+
+
+def _seed(seed: int):
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+
+def _init_worker(env_factory: Callable[[], Environment], seed: int, counter):
+    global _worker_env
+    with counter.get_lock():
+        worker_id = counter.value
+        counter.value += 1
+    _seed(seed + worker_id)
+    _worker_env = env_factory()
+
+
+def _play(task) -> float:
+    seed, ranking = task
+    # The environment draws the initial state of the episode on reset, after seeding,
+    # so the result does not depend on the worker that plays it.
+    _seed(seed)
+    _worker_env.seed(seed)
+    return _worker_env.play(ranking)
+
+
+class RolloutExecutor:
+    """Evaluates batches of rankings in parallel on a pool of worker processes.
+
+    Each worker builds its own environment once (with `env_factory`) and keeps it for all the episodes it plays.
+    Episodes are seeded deterministically by their submission order, and results are returned in that order.
+    The seed of an episode determines its result as long as the environment draws its initial state on reset
+    from the random state reseeded by `Environment.seed` (e.g., FFL with `fresh_maps=True` or with a map bank).
+    An environment with a fixed initial state (e.g., FFL with one map) keeps the state of its worker instead.
+    """
+    def __init__(
+        self,
+        env_factory: Callable[[], Environment],
+        n_workers: Optional[int] = None,
+        seed: int = 0,
+        mp_context: Optional[str] = None
+    ):
+        """Start the pool of workers.
+
+        Args:
+            env_factory (Callable[[], Environment]): picklable callable that creates the environment of a worker,
+                e.g., `functools.partial(FFL, argument_actions, 8, 0.8, fresh_maps=True)`.
+            n_workers (Optional[int], optional): number of worker processes. Defaults to the number of CPUs.
+            seed (int, optional): base seed of the workers and episodes. Defaults to 0.
+            mp_context (Optional[str], optional): multiprocessing start method ('fork', 'spawn'...). Defaults to the platform default.
+        """
+        context = mp.get_context(mp_context)
+        self._seed = seed
+        self._n_submitted = 0
+        self._pool = ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(env_factory, seed, context.Value('i', 0)),
+        )
+
+    def evaluate(self, rankings: List[argm.Ranking]) -> List[float]:
+        """Plays one episode with each ranking and returns the total rewards, in the same order as the rankings."""
+        seeds = [self._seed + self._n_submitted + i for i in range(len(rankings))]
+        self._n_submitted += len(rankings)
+        return list(self._pool.map(_play, zip(seeds, rankings)))
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
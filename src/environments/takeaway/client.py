@@ -0,0 +1,282 @@
+import asyncio
+import itertools
+import struct
+from enum import IntEnum
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from argumentation import utils as argm
+from environments.environment import Environment
+
+
+class SimulatorEndpoint(NamedTuple):
+    """Addresses of one rcssserver instance running keepaway_orla players."""
+    send_host: str
+    send_port: int
+    recv_host: str
+    recv_port: int
+    ranking_path: Optional[str] = None
+
+
+def port_pool(
+    n: int,
+    send_host: str,
+    send_port: int,
+    recv_host: str,
+    recv_port: int,
+    ranking_path: Optional[str] = None
+) -> List[SimulatorEndpoint]:
+    """Endpoints of n simulators, where simulator i listens on send_port+i and replies to recv_port+i.
+
+    Args:
+        ranking_path (Optional[str], optional): path of the ranking file, formatted with the index of the simulator
+            (e.g., "ranking_{}.txt"). Defaults to None.
+    """
+    return [
+        SimulatorEndpoint(send_host, send_port + i, recv_host, recv_port + i,
+                          None if ranking_path is None else ranking_path.format(i))
+        for i in range(n)
+    ]
+
+
+# Header of the binary ranking in start messages: magic, version, kind and number of ranked arguments.
+RANKING_MAGIC = b"RK"
+RANKING_VERSION = 1
+RANKING_HEADER = struct.Struct("<2sBBH")
+
+
+class RankingKind(IntEnum):
+    PERMUTATION = 0  # One argument per level.
+    LEVELS      = 1  # Followed by the number of levels and the size of each level.
+
+
+def encode_ranking(index: Dict[str, int], ranking: argm.Ranking) -> bytes:
+    """Encodes a ranking as the indices of its arguments, in ranking order, as little-endian uint16.
+
+    Strict rankings are sent as a permutation. Otherwise, the sizes of the levels are appended.
+
+    Args:
+        index (Dict[str, int]): index of each argument (as in the ranking file read by the players).
+        ranking (argm.Ranking): ranking to encode.
+    """
+    indices = [index[arg] for level in ranking for arg in level]
+    sizes = [len(level) for level in ranking]
+    strict = all(size == 1 for size in sizes)
+    kind = RankingKind.PERMUTATION if strict else RankingKind.LEVELS
+    payload = RANKING_HEADER.pack(RANKING_MAGIC, RANKING_VERSION, kind, len(indices))
+    payload += np.asarray(indices, dtype="<u2").tobytes()
+    if not strict:
+        payload += struct.pack("<H", len(sizes)) + np.asarray(sizes, dtype="<u2").tobytes()
+    return payload
+
+
+def decode_ranking(payload: bytes) -> List[List[int]]:
+    """Inverse of `encode_ranking`: returns the ranking as levels of argument indices."""
+    magic, version, kind, n = RANKING_HEADER.unpack_from(payload)
+    if magic != RANKING_MAGIC or version != RANKING_VERSION:
+        raise ValueError("Unsupported ranking encoding (magic {!r}, version {})".format(magic, version))
+    offset = RANKING_HEADER.size
+    indices = np.frombuffer(payload, dtype="<u2", count=n, offset=offset).tolist()
+    if kind == RankingKind.PERMUTATION:
+        return [[idx] for idx in indices]
+    offset += 2*n
+    n_levels, = struct.unpack_from("<H", payload, offset)
+    sizes = np.frombuffer(payload, dtype="<u2", count=n_levels, offset=offset + 2).tolist()
+    bounds = list(itertools.accumulate(sizes, initial=0))
+    return [indices[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def start_message(episode_id: Optional[int] = None, ranking: Optional[bytes] = None) -> bytes:
+    """Start message of an episode: "start" (as expected by the original players) or "start <episode_id>",
+    optionally followed by a newline and the encoded ranking."""
+    message = b"start" if episode_id is None else "start {}".format(episode_id).encode()
+    if ranking is not None:
+        message += b"\n" + ranking
+    return message
+
+
+def parse_reply(data: bytes) -> Tuple[Optional[int], float]:
+    """Parses a reply of the simulator, either "<episode_id> <duration>" or the legacy "<duration>".
+
+    Returns:
+        Tuple[Optional[int], float]: episode ID (None for legacy replies) and episode duration.
+    """
+    fields = data.decode("utf-8").split()
+    if len(fields) == 1:
+        return None, float(fields[0])
+    if len(fields) == 2:
+        return int(fields[0]), float(fields[1])
+    raise ValueError("Malformed reply: {!r}".format(data))
+
+
+class _Simulator(asyncio.DatagramProtocol):
+    """Persistent socket of one simulator, bound to its reply port, and the episode it is currently playing."""
+    def __init__(self, endpoint: SimulatorEndpoint):
+        self.endpoint = endpoint
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.episode_id: Optional[int] = None
+        self.result: Optional[asyncio.Future] = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            episode_id, duration = parse_reply(data)
+        except ValueError as e:
+            print("warning: {}".format(e))
+            return
+        # Late replies (to an episode that timed out) and duplicated replies are dropped.
+        # Untagged replies of legacy players can only be attributed to the current episode.
+        if self.result is None or self.result.done():
+            return
+        if episode_id is not None and episode_id != self.episode_id:
+            return
+        self.result.set_result(duration)
+
+    def start(self, episode_id: int, ranking: Optional[bytes] = None, tagged: bool = False) -> asyncio.Future:
+        self.episode_id = episode_id
+        self.result = asyncio.get_running_loop().create_future()
+        message = start_message(episode_id if tagged else None, ranking)
+        self.transport.sendto(message, (self.endpoint.send_host, self.endpoint.send_port))
+        return self.result
+
+
+class AsyncTakeaway:
+    """Asynchronous client that plays Takeaway episodes concurrently on a pool of rcssserver instances.
+
+    Each simulator keeps a single socket, bound to its reply port, for the whole run. With `tagged`, episodes are
+    tagged with an ID in the start message ("start <episode_id>"), and replies ("<episode_id> <duration>") are only
+    attributed to the episode with the same ID. Otherwise, the start message is the plain "start" of the original
+    players, and a reply is attributed to the episode being played: a late reply to an episode that timed out
+    may then be taken as the result of its restart.
+    """
+    def __init__(
+        self,
+        args: argm.Arguments,
+        endpoints: List[SimulatorEndpoint],
+        timeout: float = 10.,
+        max_retries: Optional[int] = None,
+        in_band: bool = False,
+        tagged: bool = False
+    ):
+        """Initialise the client (call `open` before playing).
+
+        Args:
+            args (argm.Arguments): list of arguments to order (or dictionary {argument: action}).
+            endpoints (List[SimulatorEndpoint]): simulators of the pool, each one with its own pair of ports.
+            timeout (float, optional): seconds to wait for the result of an episode before restarting it. Defaults to 10.
+            max_retries (Optional[int], optional): restarts of an episode before raising TimeoutError. Defaults to None (no limit).
+            in_band (bool, optional): whether the ranking is sent in the start message (see `encode_ranking`).
+                Rankings are still written to the `ranking_path` of the endpoints that have one. Defaults to False.
+            tagged (bool, optional): whether start messages carry the episode ID, which the players must echo in their
+                replies (see `parse_reply`). Defaults to False (the protocol of the original players).
+        """
+        self._arguments = list(args)
+        self._tagged = tagged
+        self._index = {arg: i for i, arg in enumerate(self._arguments)}
+        self._in_band = in_band
+        self._endpoints = endpoints
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self._episode_ids = itertools.count()
+        self._simulators: List[_Simulator] = []
+        self._idle: Optional[asyncio.Queue] = None
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self._idle = asyncio.Queue()
+        for endpoint in self._endpoints:
+            _, simulator = await loop.create_datagram_endpoint(
+                lambda endpoint=endpoint: _Simulator(endpoint),
+                local_addr=(endpoint.recv_host, endpoint.recv_port))
+            self._simulators.append(simulator)
+            self._idle.put_nowait(simulator)
+
+    async def close(self):
+        for simulator in self._simulators:
+            simulator.transport.close()
+        self._simulators = []
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def play(self, ranking: argm.Ranking) -> float:
+        """Plays one episode on the first idle simulator.
+
+        Returns:
+            float: the reward of the episode (minus its duration).
+        """
+        simulator = await self._idle.get()
+        try:
+            return await self._play(simulator, ranking)
+        finally:
+            self._idle.put_nowait(simulator)
+
+    async def evaluate(self, rankings: List[argm.Ranking]) -> List[float]:
+        """Plays one episode with each ranking, as many at a time as simulators, and returns the rewards in order."""
+        return list(await asyncio.gather(*(self.play(ranking) for ranking in rankings)))
+
+    async def _play(self, simulator: _Simulator, ranking: argm.Ranking) -> float:
+        if simulator.endpoint.ranking_path is not None:
+            argm.save_ranking(simulator.endpoint.ranking_path, self._arguments, ranking)
+        payload = encode_ranking(self._index, ranking) if self._in_band else None
+        for attempt in itertools.count():
+            # A restarted episode gets a new ID, so that a late reply to the missed one is not taken as its result.
+            result = simulator.start(next(self._episode_ids), payload, self._tagged)
+            try:
+                duration = await asyncio.wait_for(result, self._timeout)
+                return - duration
+            except asyncio.TimeoutError:
+                if self._max_retries is not None and attempt >= self._max_retries:
+                    raise
+                print("warning: missed result of episode {} on port {}".format(
+                    simulator.episode_id, simulator.endpoint.send_port))
+
+
+class PooledTakeaway(Environment):
+    """Blocking interface of `AsyncTakeaway`, usable as any other environment.
+
+    It runs its own event loop, so that the sockets of the simulators persist across calls.
+    """
+    def __init__(
+        self,
+        args: argm.Arguments,
+        endpoints: List[SimulatorEndpoint],
+        timeout: float = 10.,
+        max_retries: Optional[int] = None,
+        in_band: bool = False,
+        tagged: bool = False
+    ):
+        super().__init__(args, None)
+        self._loop = asyncio.new_event_loop()
+        self._client = AsyncTakeaway(self._arguments, endpoints, timeout, max_retries, in_band, tagged)
+        self._loop.run_until_complete(self._client.open())
+
+    def get_premises(self, obs):
+        pass
+
+    def get_arguments(self, premises):
+        pass
+
+    def update_memory(self, obs, act):
+        pass
+
+    def reset_memory(self, obs, act):
+        pass
+
+    def play(self, ranking: argm.Ranking) -> float:
+        return self._loop.run_until_complete(self._client.play(ranking))
+
+    def evaluate(self, rankings: List[argm.Ranking]) -> List[float]:
+        """Plays the rankings concurrently on all the simulators and returns the rewards in order."""
+        return self._loop.run_until_complete(self._client.evaluate(rankings))
+
+    def close(self):
+        self._loop.run_until_complete(self._client.close())
+        self._loop.close()
@@ -0,0 +1,130 @@
+"""Local stand-in for rcssserver with keepaway_orla players, to run the Takeaway client without RoboCup.
+
+Each simulator listens for start messages ("start <episode_id>", or the legacy "start", optionally followed by
+the encoded ranking) and, after a delay, replies with the duration of the episode ("<episode_id> <duration>",
+or "<duration>" for untagged starts).
+
+Usage:
+    python -m environments.takeaway.standin --n 4 --send-port 6000 --recv-port 7000
+"""
+import argparse
+import asyncio
+import random
+import struct
+from typing import Callable, List, Optional, Tuple
+
+from environments.takeaway.client import SimulatorEndpoint, decode_ranking, port_pool
+
+
+def parse_start(data: bytes) -> Tuple[Optional[int], Optional[List[List[int]]]]:
+    """Parses a start message (see `start_message`).
+
+    Returns:
+        Tuple[Optional[int], Optional[List[List[int]]]]: episode ID (None for the legacy untagged "start")
+            and ranking, as levels of argument indices (None if it is not sent in the message).
+    """
+    line, _, payload = data.partition(b"\n")
+    fields = line.split()
+    if not fields or fields[0] != b"start" or len(fields) > 2:
+        raise ValueError("Malformed start message: {!r}".format(data))
+    episode_id = int(fields[1]) if len(fields) == 2 else None
+    ranking = decode_ranking(payload) if payload else None
+    return episode_id, ranking
+
+
+class StandinSimulator(asyncio.DatagramProtocol):
+    """Simulator that replies to every start message with a random episode duration."""
+    def __init__(
+        self,
+        endpoint: SimulatorEndpoint,
+        delay: float = 0.,
+        duration: Optional[Callable[[], float]] = None,
+        drop: float = 0.,
+        legacy: bool = False,
+        seed: Optional[int] = None
+    ):
+        """Initialise the simulator (call `open` to start listening).
+
+        Args:
+            endpoint (SimulatorEndpoint): the simulator listens on (send_host, send_port) and replies to (recv_host, recv_port).
+            delay (float, optional): seconds between a start message and its reply. Defaults to 0.
+            duration (Optional[Callable[[], float]], optional): draws the duration of an episode. Defaults to uniform in [5, 20].
+            drop (float, optional): probability of never replying to an episode, to exercise the timeouts of the client. Defaults to 0.
+            legacy (bool, optional): whether replies are untagged, as those of the original players. Defaults to False.
+            seed (Optional[int], optional): seed of the durations and drops. Defaults to None.
+        """
+        self.endpoint = endpoint
+        self.delay = delay
+        self.rng = random.Random(seed)
+        self.duration = duration or (lambda: self.rng.uniform(5, 20))
+        self.drop = drop
+        self.legacy = legacy
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        # (episode ID, duration) of every reply sent, and the ranking of every start message with one.
+        self.replies: List[Tuple[Optional[int], float]] = []
+        self.rankings: List[List[List[int]]] = []
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(
+            lambda: self, local_addr=(self.endpoint.send_host, self.endpoint.send_port))
+
+    def close(self):
+        self.transport.close()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            episode_id, ranking = parse_start(data)
+        except (ValueError, struct.error) as e:
+            print("warning: {}".format(e))
+            return
+        if ranking is not None:
+            self.rankings.append(ranking)
+        if self.rng.random() < self.drop:
+            return
+        asyncio.get_running_loop().call_later(self.delay, self._reply, episode_id, self.duration())
+
+    def _reply(self, episode_id: Optional[int], duration: float):
+        if self.transport.is_closing():
+            return
+        if self.legacy or episode_id is None:
+            message = "{}".format(duration)
+        else:
+            message = "{} {}".format(episode_id, duration)
+        self.replies.append((episode_id, duration))
+        self.transport.sendto(message.encode(), (self.endpoint.recv_host, self.endpoint.recv_port))
+
+
+async def serve(endpoints: List[SimulatorEndpoint], **kwargs):
+    """Runs one stand-in simulator per endpoint until cancelled."""
+    simulators = [StandinSimulator(endpoint, **kwargs) for endpoint in endpoints]
+    for simulator in simulators:
+        await simulator.open()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for simulator in simulators:
+            simulator.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in rcssserver for the Takeaway client.")
+    parser.add_argument("--n", type=int, default=1, help="number of simulators")
+    parser.add_argument("--send-host", default="127.0.0.1")
+    parser.add_argument("--send-port", type=int, default=6000, help="port of the first simulator")
+    parser.add_argument("--recv-host", default="127.0.0.1")
+    parser.add_argument("--recv-port", type=int, default=7000, help="reply port of the first simulator")
+    parser.add_argument("--delay", type=float, default=0.1, help="seconds per episode")
+    parser.add_argument("--drop", type=float, default=0., help="probability of not replying")
+    parser.add_argument("--legacy", action="store_true", help="send untagged replies")
+    parser.add_argument("--seed", type=int, default=None)
+    opts = parser.parse_args()
+
+    endpoints = port_pool(opts.n, opts.send_host, opts.send_port, opts.recv_host, opts.recv_port)
+    try:
+        asyncio.run(serve(endpoints, delay=opts.delay, drop=opts.drop, legacy=opts.legacy, seed=opts.seed))
+    except KeyboardInterrupt:
+        pass
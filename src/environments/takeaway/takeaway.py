@@ -1,6 +1,7 @@
-from typing import List
+from typing import List, Optional
 import socket
 from argumentation import utils as argm
+from environments.takeaway.client import encode_ranking, start_message
 from environments.takeaway.utils import get_global_values
 from environments.environment import Environment
 
@@ -17,7 +18,8 @@ class Takeaway(Environment):
         send_port: int,
         recv_host: str,
         recv_port: int,
-        ranking_path: str
+        ranking_path: Optional[str] = None,
+        in_band: bool = False
     ):
         """Initialise Takeaway
 
@@ -27,7 +29,9 @@ class Takeaway(Environment):
             send_port (int): port of the WSL instance
             recv_host (str): IP of the windows host
             recv_port (int): port of the windows host
-            ranking_path (str): path where the ranking will be written (and read by the RoboCup takers).
+            ranking_path (Optional[str], optional): path where the ranking will be written (and read by the RoboCup takers).
+                Defaults to None (the ranking is not written).
+            in_band (bool, optional): whether the ranking is sent in the start message (see `encode_ranking`). Defaults to False.
         """
     
         super().__init__(args, None)
@@ -39,6 +43,9 @@ class Takeaway(Environment):
         self._recv_host = recv_host
         self._recv_port = recv_port
         self._ranking_path = ranking_path
+        self._in_band = in_band
+        self._index = {arg: i for i, arg in enumerate(self._arguments)}
+        self._payload = None
 
     def get_premises(self, obs):
         pass
@@ -58,7 +65,9 @@ class Takeaway(Environment):
         Returns:
             float: the reward output by the game
         """
-        argm.save_ranking(self._ranking_path, self._arguments, ranking)
+        if self._ranking_path is not None:
+            argm.save_ranking(self._ranking_path, self._arguments, ranking)
+        self._payload = encode_ranking(self._index, ranking) if self._in_band else None
         self._start_game()
         reward = self._wait_termination()
         return reward        
@@ -67,7 +76,7 @@ class Takeaway(Environment):
         """Send rcssserver a message to start the episode.
         """
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-            s.sendto("start".encode(), (self._send_host, self._send_port))
+            s.sendto(start_message(ranking=self._payload), (self._send_host, self._send_port))
 
     def _wait_termination(self) -> float:
         """Wait until it receives a reward from rcssserver, indicating the end of the episode.
@@ -0,0 +1,160 @@
+"""Parsing and statistics of keepaway match logs (.kwy).
+
+Each line of a log is an episode: episode number, start time, end time, duration (in simulator steps of 100ms)
+and termination condition: (o)ut of bounds, (t)aken away or (w) (timeout of the episode).
+Parsed columns are cached next to the log (<log>.npz), and logs that are still being written are parsed incrementally.
+"""
+import io
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['episode', 'start', 'end', 'duration', 'termination']
+TERMINATIONS = ['o', 't', 'w']
+
+# Number of bytes at the beginning of a log used to check that the cache belongs to it.
+PREFIX_SIZE = 1024
+
+
+class MatchLog:
+    """Columns of a keepaway log, kept up to date with the file as it grows."""
+    def __init__(self, path: str, cache: bool = True):
+        """Load the log, from its cache if it is up to date.
+        Args:
+            path (str): path of the .kwy file.
+            cache (bool, optional): whether the parsed columns are read from and written to <path>.npz. Defaults to True.
+        """
+        self.path = path
+        self.cache_path = path + '.npz' if cache else None
+        self._columns = {col: np.zeros(0, dtype=int) for col in COLUMNS}
+        self._offset = 0
+        self._prefix = b''
+        self._stat = None
+        if self.cache_path is not None:
+            self._load_cache()
+        self.update()
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        with np.load(self.cache_path) as cache:
+            columns = {col: cache[col] for col in COLUMNS}
+            offset = int(cache['offset'])
+            prefix = cache['prefix'].tobytes()
+        # The log must still start as it did when it was cached (it can only have been appended to).
+        with open(self.path, 'rb') as f:
+            if f.read(len(prefix)) != prefix or os.fstat(f.fileno()).st_size < offset:
+                return
+        self._columns, self._offset, self._prefix = columns, offset, prefix
+
+    def _save_cache(self):
+        tmp_path = self.cache_path[:-len('.npz')] + '.tmp.npz'
+        np.savez(tmp_path, offset=self._offset, prefix=np.frombuffer(self._prefix, dtype=np.uint8), **self._columns)
+        os.replace(tmp_path, self.cache_path)
+
+    def update(self) -> int:
+        """Parses the episodes appended to the log since the last update.
+        Returns:
+            int: number of new episodes.
+        """
+        stat = os.stat(self.path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key == self._stat:
+            return 0
+        with open(self.path, 'rb') as f:
+            if len(self._prefix) < PREFIX_SIZE:
+                self._prefix = f.read(PREFIX_SIZE)
+            f.seek(self._offset)
+            chunk = f.read()
+        # A line that is still being written is parsed in the next update.
+        end = chunk.rfind(b'\n') + 1
+        new = self._parse(chunk[:end])
+        self._offset += end
+        self._stat = key
+        if len(new['episode']) == 0:
+            return 0
+        self._columns = {col: np.concatenate([self._columns[col], new[col]]) for col in COLUMNS}
+        if self.cache_path is not None:
+            self._save_cache()
+        return len(new['episode'])
+
+    @staticmethod
+    def _parse(chunk: bytes) -> Dict[str, np.ndarray]:
+        if not chunk.strip(b'#\n\t '):
+            return {col: np.zeros(0, dtype=int) for col in COLUMNS}
+        data = pd.read_csv(io.BytesIO(chunk), comment='#', header=None, sep='\t', names=COLUMNS,
+                           dtype={'episode': np.int64, 'start': np.int64, 'end': np.int64, 'duration': np.int64, 'termination': str})
+        columns = {col: data[col].to_numpy() for col in COLUMNS[:-1]}
+        # Terminations are stored as their index in TERMINATIONS.
+        columns['termination'] = np.searchsorted(TERMINATIONS, data['termination'].to_numpy(dtype=str)).astype(np.int8)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self._columns['episode'])
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self._columns[column]
+
+    def durations(self, last: int = 0) -> np.ndarray:
+        """Performance metric of each episode, in seconds: its duration, plus 20s for episodes ending with (w).
+        Args:
+            last (int, optional): only the last episodes. Defaults to 0 (all).
+        """
+        durations = self['duration'] / 10 + 20 * (self['termination'] == TERMINATIONS.index('w'))
+        return durations[-last:] if last > 0 else durations
+
+    def terminations(self, last: int = 0) -> Dict[str, float]:
+        """Fraction of the episodes that end with each termination condition."""
+        codes = self['termination'][-last:] if last > 0 else self['termination']
+        counts = np.bincount(codes, minlength=len(TERMINATIONS))
+        return dict(zip(TERMINATIONS, counts / max(len(codes), 1)))
+
+
+def mean_se(data: np.ndarray) -> Tuple[float, float]:
+    """Mean and standard error (with the population standard deviation, as in the analysis notebook)."""
+    data = np.asarray(data, dtype=float)
+    return data.mean(), data.std() / np.sqrt(len(data))
+
+
+def rolling_mean(data: np.ndarray, window: int) -> np.ndarray:
+    """Mean of each window of `window` consecutive values, NaN for the first window-1 values (as `pd.Series.rolling`)."""
+    data = np.asarray(data, dtype=float)
+    cumsum = np.concatenate([[0.], np.cumsum(data)])
+    res = np.full(len(data), np.nan)
+    res[window-1:] = (cumsum[window:] - cumsum[:-window]) / window
+    return res
+
+
+def rolling_se(data: np.ndarray, window: int) -> np.ndarray:
+    """Standard error of the mean of each window (see `rolling_mean`)."""
+    data = np.asarray(data, dtype=float)
+    mean = rolling_mean(data, window)
+    mean_sq = rolling_mean(data**2, window)
+    return np.sqrt(np.maximum(mean_sq - mean**2, 0) / window)
+
+
+def summary(root: str, last: int = 0) -> pd.DataFrame:
+    """Statistics of all the logs in `root`, organised as <root>/<field size>/<agent>.kwy.
+    Args:
+        root (str): directory of the match logs.
+        last (int, optional): only the last episodes of each log. Defaults to 0 (all).
+    Returns:
+        pd.DataFrame: episodes, mean and standard error of the durations, and fraction of each termination, per field size and agent.
+    """
+    rows = []
+    for field_size in sorted(os.listdir(root)):
+        directory = os.path.join(root, field_size)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.kwy'):
+                continue
+            log = MatchLog(os.path.join(directory, name))
+            durations = log.durations(last)
+            mean, se = mean_se(durations)
+            row = {'field_size': field_size, 'agent': name[:-len('.kwy')], 'episodes': len(durations), 'mean': mean, 'se': se}
+            row.update(log.terminations(last))
+            rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,219 @@
+"""Streaming statistics of the returns of a training run, with constant memory and constant cost per episode.
+
+Usage (in a training loop):
+    metrics = TrainingMetrics(windows=(batch_size, 1000))
+    ...
+    metrics.update(score)
+    t_episodes.set_postfix(metrics.summary())
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+class RingBuffer:
+    """The last `capacity` values of a stream, in a preallocated array."""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity)
+        self._next = 0
+        self._count = 0
+
+    def append(self, value: float) -> Optional[float]:
+        """Appends a value and returns the one it overwrites (None while the buffer is not full)."""
+        old = self._data[self._next] if self._count == self.capacity else None
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        return old
+
+    def __len__(self) -> int:
+        return self._count
+
+    def values(self) -> np.ndarray:
+        """The values in the buffer, from the oldest to the newest."""
+        if self._count < self.capacity:
+            return self._data[:self._count].copy()
+        return np.roll(self._data, -self._next)
+
+
+class RunningStats:
+    """Mean and variance of all the values of a stream (Welford's algorithm)."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.
+        self._m2 = 0.
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def var(self) -> float:
+        return self._m2 / self.count if self.count > 0 else np.nan
+
+    @property
+    def std(self) -> float:
+        return np.sqrt(self.var)
+
+    @property
+    def se(self) -> float:
+        return self.std / np.sqrt(self.count) if self.count > 0 else np.nan
+
+
+class WindowStats:
+    """Mean and variance of the last `size` values of a stream, updated in O(1) with running sums."""
+    def __init__(self, size: int):
+        self.size = size
+        self._buffer = RingBuffer(size)
+        self._sum = 0.
+        self._sum_sq = 0.
+        self._updates = 0
+
+    def update(self, value: float):
+        old = self._buffer.append(value)
+        self._sum += value
+        self._sum_sq += value * value
+        if old is not None:
+            self._sum -= old
+            self._sum_sq -= old * old
+        self._updates += 1
+        if self._updates % self.size == 0:
+            # Recompute the sums from time to time, so that rounding errors do not accumulate.
+            values = self._buffer.values()
+            self._sum, self._sum_sq = values.sum(), (values**2).sum()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def mean(self) -> float:
+        return self._sum / len(self) if len(self) > 0 else np.nan
+
+    @property
+    def var(self) -> float:
+        if len(self) == 0:
+            return np.nan
+        return max(self._sum_sq / len(self) - self.mean**2, 0.)
+
+    @property
+    def std(self) -> float:
+        return np.sqrt(self.var)
+
+    @property
+    def se(self) -> float:
+        return self.std / np.sqrt(len(self)) if len(self) > 0 else np.nan
+
+    def values(self) -> np.ndarray:
+        return self._buffer.values()
+
+
+class EWMA:
+    """Exponentially weighted moving average, corrected for its initialisation at zero."""
+    def __init__(self, alpha: float = 0.01):
+        self.alpha = alpha
+        self._value = 0.
+        self._weight = 0.
+
+    def update(self, value: float):
+        self._value = (1 - self.alpha) * self._value + self.alpha * value
+        self._weight = (1 - self.alpha) * self._weight + self.alpha
+
+    @property
+    def value(self) -> float:
+        return self._value / self._weight if self._weight > 0 else np.nan
+
+
+class DownsampledHistory:
+    """Means of consecutive blocks of values, at most `capacity` of them, to plot the whole run.
+
+    When the history is full, adjacent blocks are merged and the block size doubles.
+    """
+    def __init__(self, capacity: int = 1000):
+        if capacity < 2:
+            # Merging needs pairs of blocks (an odd capacity is rounded down to an even one).
+            raise ValueError("capacity must be at least 2, got {}".format(capacity))
+        self.capacity = capacity - capacity % 2
+        self.block = 1
+        self._means = np.zeros(self.capacity)
+        self._n_blocks = 0
+        self._sum = 0.
+        self._count = 0
+        self.total = 0
+
+    def update(self, value: float):
+        self._sum += value
+        self._count += 1
+        self.total += 1
+        if self._count < self.block:
+            return
+        if self._n_blocks == self.capacity:
+            merged = self._means.reshape(-1, 2).mean(axis=1)
+            self._means[:len(merged)] = merged
+            self._n_blocks = len(merged)
+            self.block *= 2
+            if self._count < self.block:
+                # The current block now needs to be as long as the merged ones.
+                return
+        self._means[self._n_blocks] = self._sum / self._count
+        self._n_blocks += 1
+        self._sum = 0.
+        self._count = 0
+
+    def history(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the index of the last episode of each complete block and the mean of the block."""
+        episodes = (np.arange(self._n_blocks) + 1) * self.block
+        return episodes, self._means[:self._n_blocks].copy()
+
+
+class TrainingMetrics:
+    """Running statistics of the returns of a training run: over all the run, over several windows and an EWMA."""
+    def __init__(self, windows: Iterable[int] = (100, 1000), ewma_alpha: float = 0.01, history: int = 1000):
+        """Initialise the statistics.
+        Args:
+            windows (Iterable[int], optional): sizes of the running windows. Defaults to (100, 1000).
+            ewma_alpha (float, optional): smoothing factor of the EWMA. Defaults to 0.01.
+            history (int, optional): maximum number of points kept to plot the run. Defaults to 1000.
+        """
+        self.windows = {size: WindowStats(size) for size in windows}
+        self.running = RunningStats()
+        self.ewma = EWMA(ewma_alpha)
+        self.history = DownsampledHistory(history)
+
+    def update(self, returns):
+        """Adds the return of an episode, or the returns of several episodes."""
+        for value in np.atleast_1d(returns):
+            value = float(value)
+            self.running.update(value)
+            self.ewma.update(value)
+            self.history.update(value)
+            for window in self.windows.values():
+                window.update(value)
+
+    @property
+    def episodes(self) -> int:
+        return self.running.count
+
+    def window(self, size: int) -> WindowStats:
+        return self.windows[size]
+
+    def summary(self) -> Dict[str, float]:
+        """Mean of each window and the EWMA (e.g., to be shown as the postfix of a progress bar)."""
+        res = {'avg_{}'.format(size): window.mean for size, window in self.windows.items()}
+        res['ewma'] = self.ewma.value
+        return res
+
+    def plot(self, scale: float = 1.):
+        """Plots the downsampled history of the returns (multiplied by `scale`)."""
+        episodes, means = self.history.history()
+        plt.plot(episodes, scale * means)
+        plt.xlabel("Episode #")
+        plt.ylabel("Return")
+        plt.show()
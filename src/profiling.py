@@ -0,0 +1,274 @@
+"""Timers, counters and latency histograms for the hot paths of training.
+
+Instrumentation is installed at runtime, by wrapping the hot functions when profiling is enabled and restoring
+the originals when it is disabled. Hence, disabled profiling costs nothing.
+
+Usage:
+    import profiling
+    profiling.enable()
+    ... train ...
+    print(profiling.report())
+    profiling.disable()
+"""
+import functools
+import importlib
+import inspect
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Histogram buckets per power of two of the latency (in nanoseconds).
+BUCKETS_PER_OCTAVE = 4
+N_BUCKETS = 64 * BUCKETS_PER_OCTAVE
+
+# Hot paths instrumented by default: phase name and function, as "module:Class.attribute" or "module:function".
+# Overrides are hooked under the name of the phase they implement (unless they call the hooked base method).
+DEFAULT_HOOKS: List[Tuple[str, str]] = [
+    ('decode_ranking', 'agents.orla:ORLA.decode_ranking'),
+    ('decode_rankings', 'agents.agent:Agent.decode_rankings'),
+    ('decode_rankings', 'agents.plackett_luce:PlackettLuce.decode_rankings'),
+    ('evaluate_rankings', 'agents.agent:Agent.evaluate_rankings'),
+    ('evaluate_rankings', 'agents.plackett_luce:PlackettLuce.evaluate_rankings'),
+    ('ranking_to_matrix', 'argumentation.utils:ranking_to_matrix'),
+    ('get_vsaf', 'environments.environment:Environment.get_vsaf'),
+    ('get_extension', 'environments.environment:Environment.get_extension'),
+    ('select_action', 'environments.environment:Environment.select_action'),
+    ('play', 'environments.environment:Environment.play'),
+    ('play', 'environments.takeaway.takeaway:Takeaway.play'),
+    ('play', 'environments.takeaway.client:PooledTakeaway.play'),
+    ('play_batch', 'environments.takeaway.client:PooledTakeaway.evaluate'),
+    ('play_batch', 'environments.rollouts:RolloutExecutor.evaluate'),
+    ('play_batch', 'environments.foggy_frozen_lake.vectorized:VectorFFL.play'),
+    ('vaf_reorder', 'argumentation.classes:ValuebasedArgumentationFramework.reorder'),
+    ('compile_vaf', 'argumentation.classes:CompiledVAF.__init__'),
+    ('env_reset', 'environments.foggy_frozen_lake.FFL:FFL.reset'),
+    ('env_step', 'environments.foggy_frozen_lake.world:FrozenLakeWrapper.step'),
+    ('takeaway_wait', 'environments.takeaway.takeaway:Takeaway._wait_termination'),
+    ('takeaway_episode', 'environments.takeaway.client:AsyncTakeaway._play'),
+    ('learn', 'agents.orla:ORLABaseline.learn'),
+    ('policy_update', 'agents.orla:ORLA.learn'),
+]
+
+# Counted by default: counter name, function, and increment given the result and the arguments of each call.
+DEFAULT_COUNTERS: List[Tuple[str, str, Callable[..., int]]] = [
+    ('episodes_learnt', 'agents.orla:ORLA.learn', lambda result, agent, probs, advantages, *args: len(advantages)),
+    ('random_actions', 'environments.environment:Environment.get_extension_action', lambda result, env, ext: len(ext) == 0),
+    ('return_cache_hits', 'environments.return_cache:ReturnCache.lookup', lambda result, *args: result is not None),
+    ('return_cache_misses', 'environments.return_cache:ReturnCache.lookup', lambda result, *args: result is None),
+]
+
+
+class Timer:
+    """Count, total, extremes and log-scale histogram of the latencies of a phase."""
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = math.inf
+        self.max = 0
+        self.histogram = np.zeros(N_BUCKETS, dtype=np.int64)
+
+    def record(self, ns: int):
+        self.count += 1
+        self.total += ns
+        self.min = min(self.min, ns)
+        self.max = max(self.max, ns)
+        self.histogram[int(BUCKETS_PER_OCTAVE * math.log2(max(ns, 1)))] += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound (in nanoseconds) of the bucket that holds the q-th percentile."""
+        if self.count == 0:
+            return math.nan
+        bucket = np.searchsorted(np.cumsum(self.histogram), q / 100 * self.count)
+        return min(2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE), self.max)
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'total_s': self.total / 1e9,
+            'mean_us': self.total / max(self.count, 1) / 1e3,
+            'min_us': self.min / 1e3 if self.count else math.nan,
+            'p50_us': self.percentile(50) / 1e3,
+            'p90_us': self.percentile(90) / 1e3,
+            'p99_us': self.percentile(99) / 1e3,
+            'max_us': self.max / 1e3,
+        }
+
+
+class Profiler:
+    """Named timers and counters, and the hooks that feed them."""
+    def __init__(self):
+        self.timers: Dict[str, Timer] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Original attributes replaced by the hooks: (owner, attribute, original).
+        self._patched: List[Tuple[object, str, object]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return len(self._patched) > 0
+
+    def record(self, name: str, ns: int):
+        with self._lock:
+            if name not in self.timers:
+                self.timers[name] = Timer()
+            self.timers[name].record(ns)
+
+    def count(self, name: str, k: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + k
+
+    @contextmanager
+    def timer(self, name: str):
+        """Times the enclosed block as the phase `name`."""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - start)
+
+    def wrap(self, name: str, func):
+        """Returns `func` timed as the phase `name` (coroutine functions are timed until they return)."""
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def timed_coroutine(*args, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter_ns() - start)
+            return timed_coroutine
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter_ns() - start)
+        return timed
+
+    def wrap_counter(self, name: str, func, increment: Callable[..., int]):
+        """Returns `func` adding `increment(result, *args, **kwargs)` to the counter `name` after every call."""
+        @functools.wraps(func)
+        def counted(*args, **kwargs):
+            result = func(*args, **kwargs)
+            self.count(name, int(increment(result, *args, **kwargs)))
+            return result
+        return counted
+
+    def enable(
+        self,
+        hooks: Optional[Iterable[Tuple[str, str]]] = None,
+        counters: Optional[Iterable[Tuple[str, str, Callable[..., int]]]] = None
+    ):
+        """Installs the hooks and counters (by default, `DEFAULT_HOOKS` and `DEFAULT_COUNTERS`).
+        Modules that cannot be imported are skipped.
+        Args:
+            hooks (Optional[Iterable[Tuple[str, str]]], optional): (phase name, "module:Class.attribute") pairs.
+            counters (Optional[Iterable[Tuple[str, str, Callable[..., int]]]], optional):
+                (counter name, "module:Class.attribute", increment) triples.
+        """
+        if self.enabled:
+            return
+        for name, target in DEFAULT_HOOKS if hooks is None else hooks:
+            self._patch(target, lambda func: self.wrap(name, func))
+        for name, target, increment in DEFAULT_COUNTERS if counters is None else counters:
+            self._patch(target, lambda func: self.wrap_counter(name, func, increment))
+
+    def _patch(self, target: str, wrap):
+        module_name, path = target.split(':')
+        try:
+            owner = importlib.import_module(module_name)
+        except ImportError:
+            return
+        *owners, attr = path.split('.')
+        for owner_name in owners:
+            owner = getattr(owner, owner_name)
+        # Read the attribute from the class dictionary, so that static and class methods keep their kind.
+        original = vars(owner)[attr]
+        if isinstance(original, (staticmethod, classmethod)):
+            patched = type(original)(wrap(original.__func__))
+        else:
+            patched = wrap(original)
+        setattr(owner, attr, patched)
+        self._patched.append((owner, attr, original))
+
+    def disable(self):
+        """Restores the original functions. The statistics are kept until `reset`."""
+        for owner, attr, original in reversed(self._patched):
+            setattr(owner, attr, original)
+        self._patched = []
+
+    def reset(self):
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'timers': {name: timer.to_dict() for name, timer in self.timers.items()},
+                'counters': dict(self.counters),
+            }
+
+    def export(self, path: str):
+        """Writes the statistics and the histograms (bucket i holds latencies below 2^((i+1)/4) ns) as JSON."""
+        res = self.to_dict()
+        with self._lock:
+            for name, timer in self.timers.items():
+                res['timers'][name]['histogram'] = timer.histogram.tolist()
+        with open(path, 'w') as f:
+            json.dump(res, f, indent=2)
+
+    def report(self) -> str:
+        """Table with the statistics of each phase, sorted by total time. Times of nested phases are inclusive."""
+        stats = self.to_dict()
+        lines = ["{:<20} {:>9} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            'phase', 'count', 'total (s)', 'mean (us)', 'p50 (us)', 'p99 (us)', 'max (us)')]
+        for name, timer in sorted(stats['timers'].items(), key=lambda item: -item[1]['total_s']):
+            lines.append("{:<20} {:>9} {:>10.3f} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+                name, timer['count'], timer['total_s'], timer['mean_us'], timer['p50_us'], timer['p99_us'], timer['max_us']))
+        for name, value in sorted(stats['counters'].items()):
+            lines.append("{:<20} {:>9}".format(name, value))
+        return "\n".join(lines)
+
+
+# Profiler used by the module-level functions.
+profiler = Profiler()
+
+
+def enable(
+    hooks: Optional[Iterable[Tuple[str, str]]] = None,
+    counters: Optional[Iterable[Tuple[str, str, Callable[..., int]]]] = None
+):
+    profiler.enable(hooks, counters)
+
+
+def disable():
+    profiler.disable()
+
+
+def report() -> str:
+    return profiler.report()
+
+
+def export(path: str):
+    profiler.export(path)
+
+
+@contextmanager
+def profiled(
+    hooks: Optional[Iterable[Tuple[str, str]]] = None,
+    counters: Optional[Iterable[Tuple[str, str, Callable[..., int]]]] = None
+):
+    """Enables profiling for the enclosed block."""
+    profiler.enable(hooks, counters)
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
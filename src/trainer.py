@@ -0,0 +1,159 @@
+"""Training loop that overlaps the environment rollouts with decoding and learning.
+
+The learner (the calling thread) decodes batches of rankings and learns from their returns, while a rollout
+thread plays them. Up to `max_staleness` batches are decoded ahead, so the rollouts of batch k+1 run while the
+agent learns from batch k. A batch is then learnt after at most `max_staleness` updates of the policy it was
+sampled from, and its probabilities are recomputed with the current policy (see `Agent.evaluate_rankings`).
+
+Learning from a stale batch is off-policy: each of its episodes is weighted by the ratio pi_now/pi_old of the
+probabilities of its ranking under the current policy and under the policy that sampled it, clipped at
+`max_ratio`. Clipping keeps the variance bounded, but biases the update towards the old policy whenever a ratio
+exceeds `max_ratio`. Batches learnt with no update since they were decoded (always the case with
+`max_staleness=0`) are on-policy, so their weights are exactly 1.
+
+Usage:
+    trainer = Trainer(orla, env, batch_size=8, metrics=TrainingMetrics(), checkpointer=Checkpointer(orla, path))
+    trainer.train(10000)
+"""
+import math
+import queue
+import threading
+from typing import Callable, List, NamedTuple, Optional
+
+import torch
+
+from agents.checkpoint import Checkpointer
+from agents.decode_state import DecodeState
+from agents.orla import ORLABaseline
+from argumentation import utils as argm
+from environments.environment import Environment
+from metrics import TrainingMetrics
+
+
+class Batch(NamedTuple):
+    """Rankings played in a batch of episodes, and the policy they were decoded with."""
+    rankings: List[argm.Ranking]
+    state: DecodeState
+    # Number of policy updates of the agent when the batch was decoded.
+    version: int
+    # (batch_size, n) log-probabilities of the rankings under the policy they were decoded with, if they may be
+    # learnt off-policy.
+    behaviour_log_probs: Optional[torch.Tensor] = None
+    returns: Optional[List[float]] = None
+
+
+class Trainer:
+    """Trains an agent on an environment, playing each batch in a rollout thread while the agent learns.
+
+    Note that the rollouts and the decoding draw random numbers concurrently, so pipelined runs are not
+    reproducible from the seeds alone (unless `max_staleness` is 0).
+    """
+    def __init__(
+        self,
+        agent: ORLABaseline,
+        env: Environment,
+        batch_size: int = 8,
+        max_staleness: int = 1,
+        max_ratio: float = 1.,
+        rollout: Optional[Callable[[List[argm.Ranking]], List[float]]] = None,
+        metrics: Optional[TrainingMetrics] = None,
+        checkpointer: Optional[Checkpointer] = None,
+        callbacks: Optional[List[Callable[["Trainer", Batch], None]]] = None,
+    ):
+        """
+        Args:
+            agent (ORLABaseline): agent to train.
+            env (Environment): environment in which the rankings are played.
+            batch_size (int, optional): episodes per update. Defaults to 8.
+            max_staleness (int, optional): most policy updates between decoding a batch and learning from it.
+                0 runs decode, play and learn in sequence. Defaults to 1.
+            max_ratio (float, optional): clip of the importance weights of stale batches. Defaults to 1.
+            rollout (Optional[Callable[[List[argm.Ranking]], List[float]]], optional): returns of a batch of rankings.
+                Defaults to `env.evaluate` if the environment plays batches (e.g., `PooledTakeaway`), or else
+                to `env.play` on each ranking.
+            metrics (Optional[TrainingMetrics], optional): updated with the returns of every batch. Defaults to None.
+            checkpointer (Optional[Checkpointer], optional): stepped after every update, with the metrics as extra
+                state. Defaults to None.
+            callbacks (Optional[List[Callable[[Trainer, Batch], None]]], optional): called after every update
+                with the batch learnt. Defaults to None.
+        """
+        if max_staleness < 0:
+            raise ValueError("max_staleness must be non-negative")
+        if max_ratio <= 0:
+            raise ValueError("max_ratio must be positive")
+        self.agent = agent
+        self.env = env
+        self.batch_size = batch_size
+        self.max_staleness = max_staleness
+        self.max_ratio = max_ratio
+        if rollout is None:
+            evaluate = getattr(env, 'evaluate', None)
+            rollout = evaluate if evaluate is not None else (lambda rankings: [env.play(ranking) for ranking in rankings])
+        self.rollout = rollout
+        self.metrics = metrics
+        self.checkpointer = checkpointer
+        self.callbacks = list(callbacks or [])
+        # Staleness of each batch learnt so far.
+        self.staleness: List[int] = []
+
+    def decode(self) -> Batch:
+        """Samples a batch of rankings from the current policy (without gradients, see `learn`)."""
+        with torch.no_grad():
+            rankings, _, state = self.agent.decode_rankings(self.batch_size, return_state=True)
+            # Scored as in `learn`, so that the ratios are exactly 1 if the policy has not changed.
+            behaviour = self.agent.evaluate_rankings(rankings, log_probs=True) if self.max_staleness > 0 else None
+        return Batch(rankings, state, self.agent.updates, behaviour)
+
+    def importance_weights(self, batch: Batch, log_probs: torch.Tensor) -> Optional[torch.Tensor]:
+        """Clipped ratios pi_now/pi_old of the probabilities of the rankings of a batch, or None if it is on-policy."""
+        if batch.version == self.agent.updates or batch.behaviour_log_probs is None:
+            return None
+        log_ratios = (log_probs.detach() - batch.behaviour_log_probs).sum(dim=1)
+        return torch.exp(log_ratios.clamp_max(math.log(self.max_ratio)))
+
+    def learn(self, batch: Batch):
+        """Learns from a played batch, with its probabilities recomputed by the current policy and stale
+        episodes weighted by their importance weights."""
+        log_probs = self.agent.evaluate_rankings(batch.rankings, log_probs=True)
+        weights = self.importance_weights(batch, log_probs)
+        self.agent.learn(batch.rankings, log_probs, batch.returns, batch.state, log_probs=True, weights=weights)
+        self.staleness.append(self.agent.updates - 1 - batch.version)
+        if self.metrics is not None:
+            self.metrics.update(batch.returns)
+        if self.checkpointer is not None:
+            self.checkpointer.step(**({'metrics': self.metrics} if self.metrics is not None else {}))
+        for callback in self.callbacks:
+            callback(self, batch)
+
+    def train(self, n_episodes: int):
+        """Trains for `n_episodes` episodes (rounded up to whole batches)."""
+        n_batches = -(-n_episodes // self.batch_size)
+        # Up to max_staleness batches are decoded ahead of the one being learnt.
+        decoded: "queue.Queue[Optional[Batch]]" = queue.Queue()
+        played: "queue.Queue[object]" = queue.Queue()
+        worker = threading.Thread(target=self._play, args=(decoded, played), name='rollout', daemon=True)
+        worker.start()
+        try:
+            sent = 0
+            for learnt in range(n_batches):
+                while sent < n_batches and sent - learnt <= self.max_staleness:
+                    decoded.put(self.decode())
+                    sent += 1
+                result = played.get()
+                if isinstance(result, BaseException):
+                    raise result
+                self.learn(result)
+        finally:
+            decoded.put(None)
+            worker.join()
+
+    def _play(self, decoded: "queue.Queue[Optional[Batch]]", played: "queue.Queue[object]"):
+        while True:
+            batch = decoded.get()
+            if batch is None:
+                return
+            try:
+                played.put(batch._replace(returns=list(self.rollout(batch.rankings))))
+            except BaseException as e:
+                played.put(e)
+                return
@@ -1,8 +1,9 @@
 import numpy as np
 import pandas as pd
-from typing import List, Tuple, Iterable
+from typing import List, Tuple, Iterable, Union
 from enum import IntEnum
 import matplotlib.pyplot as plt
+from metrics import TrainingMetrics
 
 def max_rand_tie(values: List) -> Tuple[int, float, List]:
     """Returns the maximum element of a list breaking ties at random.
@@ -40,10 +41,17 @@ class Mode (IntEnum):
     NON_STRICT = 1
 
 
-def plot_returns(returns: List[float], window: int):
-    returns = pd.DataFrame(returns)/10
-    returns = returns.rolling(window).mean()
-    plt.plot(-returns)
+def plot_returns(returns: Union[List[float], TrainingMetrics], window: int):
+    """Plots the rolling mean of the (Takeaway) returns, in seconds.
+    If `returns` is a `TrainingMetrics`, its downsampled history is plotted instead (and `window` is ignored).
+    """
+    if isinstance(returns, TrainingMetrics):
+        episodes, means = returns.history.history()
+        plt.plot(episodes, -means/10)
+    else:
+        returns = pd.DataFrame(returns)/10
+        returns = returns.rolling(window).mean()
+        plt.plot(-returns)
     plt.xlabel("Episode #")
     plt.ylabel("Return (seconds)")
     plt.show()
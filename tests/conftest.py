@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules of ORLA are imported from src, as in the notebooks.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+import torch
+
+from agents.checkpoint import Checkpointer, load, set_rng_state
+from agents.orla import ORLABaseline
+from utils import Mode
+
+ARGS = ["a{}".format(i) for i in range(6)]
+
+
+def make_agent(device=torch.device("cpu")):
+    torch.manual_seed(0)
+    return ORLABaseline(ARGS, 1e-2, 1e-2, device, Mode.STRICT)
+
+
+def train(agent, batches):
+    for _ in range(batches):
+        rankings, probs, state = agent.decode_rankings(4, return_state=True)
+        agent.learn(rankings, probs, [random.random() for _ in rankings], state)
+
+
+def test_resume_continues_the_run(tmp_path):
+    path = str(tmp_path / "orla.pt")
+    agent = make_agent()
+    train(agent, 3)
+    with Checkpointer(agent, path) as checkpointer:
+        checkpointer.save(blocking=True, note="x")
+    train(agent, 3)
+    expected = agent.decode_rankings(4)[0]
+
+    resumed = make_agent()
+    with Checkpointer(resumed, path) as checkpointer:
+        assert checkpointer.resume() == {"note": "x"}
+    assert resumed.updates == 3
+    train(resumed, 3)
+    assert resumed.decode_rankings(4)[0] == expected
+
+
+@pytest.mark.parametrize("device", ["cuda", "meta"])
+def test_resume_on_another_device(tmp_path, device):
+    if device == "cuda" and not torch.cuda.is_available():
+        pytest.skip("no CUDA device")
+    path = str(tmp_path / "orla.pt")
+    agent = make_agent()
+    train(agent, 1)
+    with Checkpointer(agent, path) as checkpointer:
+        checkpointer.save(blocking=True)
+
+    resumed = make_agent(torch.device("cuda")) if device == "cuda" else make_agent()
+    # On a machine without GPU, a meta device stands for the device of the agent: the checkpoint must not be
+    # mapped there, or the RNG states would not be CPU byte tensors anymore.
+    resumed.device = torch.device(device)
+    with Checkpointer(resumed, path) as checkpointer:
+        checkpointer.resume()
+    assert resumed.updates == 1
+    assert all(p.device.type == ("cuda" if device == "cuda" else "cpu") for p in resumed.net.parameters())
+
+
+def test_set_rng_state_of_a_checkpoint_loaded_elsewhere(tmp_path):
+    path = str(tmp_path / "orla.pt")
+    agent = make_agent()
+    with Checkpointer(agent, path) as checkpointer:
+        checkpointer.save(blocking=True)
+    state = load(path)
+    assert state["rng"]["torch"].device.type == "cpu"
+    set_rng_state(state["rng"])
@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+
+from argumentation.classes import ValuebasedArgumentationFramework
+
+
+def random_vaf_inputs(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    args = ["a{}".format(i) for i in range(n)]
+    attacks = [(a, b) for a in args for b in args if a != b and rng.random() < 0.3]
+    order = [[arg] for arg in rng.sample(args, n)]
+    return args, attacks, order
+
+
+def test_incremental_vaf_matches_vaf_built_at_once():
+    args, attacks, order = random_vaf_inputs(20)
+    expected = ValuebasedArgumentationFramework(args, attacks, order)
+
+    vaf = ValuebasedArgumentationFramework(update_on_init=False)
+    for arg in args:
+        vaf.add_argument(arg)
+    vaf.add_attacks(attacks)
+    vaf.reorder(order)
+    assert vaf.args == expected.args
+    np.testing.assert_array_equal(vaf.mat, expected.mat)
+
+    # Removing arguments and re-ordering keeps the original attacks of the remaining ones.
+    removed = args[::3]
+    vaf.remove_arguments(removed)
+    vaf.add_argument("b")
+    kept = [arg for arg in args if arg not in removed]
+    kept_order = [level for level in order if level[0] not in removed]
+    vaf.reorder(kept_order)
+    expected = ValuebasedArgumentationFramework(
+        kept + ["b"], [att for att in attacks if att[0] in kept and att[1] in kept], kept_order)
+    np.testing.assert_array_equal(vaf.mat, expected.mat)
+
+
+def test_original_attacks_grow_with_the_capacity_of_the_matrix():
+    vaf = ValuebasedArgumentationFramework(update_on_init=False)
+    reallocations = 0
+    for i in range(64):
+        base = vaf._base_mat
+        vaf.add_argument("a{}".format(i))
+        reallocations += vaf._base_mat is not base
+        assert len(vaf._base_mat) == len(vaf._mat)
+    assert reallocations <= 8
+
+
+def test_attacks_follow_the_order():
+    args, attacks, order = random_vaf_inputs(12, seed=1)
+
+    def matrix_attacks(vaf):
+        return {(vaf.args[i], vaf.args[j]) for i, j in zip(*np.nonzero(vaf.mat))}
+
+    vaf = ValuebasedArgumentationFramework(args, attacks, order)
+    assert set(vaf.atts) == matrix_attacks(vaf) < set(attacks)
+
+    vaf = ValuebasedArgumentationFramework(args, attacks, update_on_init=False)
+    assert set(vaf.atts) == set(attacks)
+    vaf.order = order
+    vaf.update_vaf()
+    assert set(vaf.atts) == matrix_attacks(vaf)
+    vaf.reorder(order[::-1])
+    assert set(vaf.atts) == matrix_attacks(vaf)
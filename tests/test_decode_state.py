@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+import pytest
+
+from agents.decode_state import DecodeState
+from argumentation import utils as argm
+from utils import Mode
+
+ARGS = ["a{}".format(i) for i in range(7)]
+
+
+def random_ranking(mode: Mode, rng: random.Random, args: argm.Arguments = ARGS) -> argm.Ranking:
+    args = rng.sample(args, len(args))
+    if mode == Mode.STRICT:
+        return [[arg] for arg in args]
+    ranking = []
+    while args:
+        size = rng.randint(1, 3)
+        ranking.append(args[:size])
+        args = args[size:]
+    return ranking
+
+
+def prefix(ranking: argm.Ranking, t: int) -> argm.Ranking:
+    """The partial ranking made of the first t arguments, with the levels of the ranking."""
+    partial, seen = [], 0
+    for level in ranking:
+        if seen == t:
+            break
+        partial.append(level[:t - seen])
+        seen += len(partial[-1])
+    return partial
+
+
+@pytest.mark.parametrize("mode", [Mode.STRICT, Mode.NON_STRICT])
+def test_states_match_ranking_to_matrix(mode):
+    rng = random.Random(0)
+    rankings = [random_ranking(mode, rng) for _ in range(5)]
+    state = DecodeState(ARGS, len(rankings), mode)
+    for t, (indices, new_level) in enumerate(state.replay(rankings)):
+        for i, ranking in enumerate(rankings):
+            partial = prefix(ranking, t)
+            np.testing.assert_array_equal(state.matrix[i], argm.ranking_to_matrix(partial, ARGS, True))
+            remaining = np.array([all(arg not in level for level in partial) for arg in ARGS])
+            expected = np.repeat(remaining, 2) if mode == Mode.NON_STRICT else remaining
+            np.testing.assert_array_equal(state.masks()[i], expected)
+        state.append(indices, new_level)
+    assert state.rankings == rankings
+    # The rows written at each step rebuild the states of the episode (see `ORLABaseline.learn`).
+    rows = state.appended_rows()
+    for i, ranking in enumerate(rankings):
+        for t in range(len(ARGS)):
+            expected = argm.ranking_to_matrix(prefix(ranking, t + 1), ARGS, True)
+            np.testing.assert_array_equal(rows[i, t], expected[state.order[i, t]])
@@ -0,0 +1,40 @@
+import random
+
+import numpy as np
+import pytest
+
+from environments.foggy_frozen_lake.FFL import FFL
+from environments.foggy_frozen_lake.utils import argument_actions
+
+
+@pytest.mark.parametrize("compact_obs", [False, True])
+def test_tile_is_the_position_in_the_observation(compact_obs):
+    env = FFL(argument_actions, 8, 0.8, rng=np.random.default_rng(0), compact_obs=compact_obs, fresh_maps=True)
+    rng = random.Random(0)
+    for _ in range(5):
+        observation, _ = env.reset()
+        env.reset_memory()
+        done = False
+        while not done:
+            expected = observation[0] if compact_obs else np.argmax(observation[24:])
+            assert env.get_tile(observation) == expected
+            action = rng.randrange(4)
+            env.update_memory(observation, action)
+            observation, _, terminated, truncated, _ = env._env.step(action)
+            done = terminated or truncated
+
+
+def test_maps_do_not_use_the_global_random_state():
+    np.random.seed(0)
+    expected = np.random.random()
+    maps = []
+    for _ in range(2):
+        np.random.seed(0)
+        env = FFL(argument_actions, 8, 0.8, rng=np.random.default_rng(1), fresh_maps=True)
+        keys = [env.episode_key()]
+        for _ in range(3):
+            env.reset()
+            keys.append(env.episode_key())
+        assert np.random.random() == expected
+        maps.append(keys)
+    assert maps[0] == maps[1] and len(set(maps[0])) > 1
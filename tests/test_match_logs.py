@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from match_logs import COLUMNS, MatchLog, mean_se, rolling_mean, rolling_se, summary
+
+HEADER = "# Keepers: 3\n# Takers: 2\n"
+
+
+def episode_lines(first, count, seed=0):
+    rng = np.random.default_rng(seed + first)
+    lines = []
+    start = 100 * first
+    for episode in range(first, first + count):
+        duration = int(rng.integers(5, 300))
+        termination = "otw"[rng.integers(3)]
+        lines.append("{}\t{}\t{}\t{}\t{}\n".format(episode, start, start + duration, duration, termination))
+        start += duration
+    return "".join(lines)
+
+
+def write(path, text, mode="w"):
+    with open(path, mode) as f:
+        f.write(text)
+
+
+def reference(path):
+    """Durations computed from the whole log with pandas, as in the analysis notebook."""
+    data = pd.read_csv(path, sep="\t", comment="#", header=None, names=COLUMNS)
+    return data["duration"] / 10 + 20 * (data["termination"] == "w")
+
+
+def test_durations_and_rolling_means_match_pandas(tmp_path):
+    path = str(tmp_path / "agent.kwy")
+    write(path, HEADER + episode_lines(1, 200))
+    log = MatchLog(path, cache=False)
+    expected = reference(path)
+    assert len(log) == 200
+    np.testing.assert_allclose(log.durations(), expected.to_numpy())
+    np.testing.assert_allclose(log.durations(50), expected.to_numpy()[-50:])
+    for window in (1, 10, 200):
+        np.testing.assert_allclose(rolling_mean(log.durations(), window), expected.rolling(window).mean().to_numpy())
+        # The running sums of squares leave rounding errors of ~1e-12 in the variance, i.e., ~1e-6 in its root.
+        np.testing.assert_allclose(rolling_se(log.durations(), window),
+                                   (expected.rolling(window).std(ddof=0) / np.sqrt(window)).to_numpy(), atol=1e-5)
+    mean, se = mean_se(log.durations())
+    np.testing.assert_allclose([mean, se], [expected.mean(), expected.std(ddof=0) / np.sqrt(len(expected))])
+    terminations = log.terminations()
+    data = pd.read_csv(path, sep="\t", comment="#", header=None, names=COLUMNS)
+    for code, fraction in terminations.items():
+        assert fraction == pytest.approx((data["termination"] == code).mean())
+
+
+def test_appended_lines_are_read_incrementally(tmp_path):
+    path = str(tmp_path / "agent.kwy")
+    write(path, HEADER + episode_lines(1, 30))
+    log = MatchLog(path)
+    assert len(log) == 30
+    assert log.update() == 0
+
+    # A line that is still being written is only parsed once it is complete.
+    lines = episode_lines(31, 20)
+    cut = lines.index("\n", len(lines) // 2) + 3
+    write(path, lines[:cut], "a")
+    added = log.update()
+    write(path, lines[cut:], "a")
+    assert added + log.update() == 20
+    np.testing.assert_allclose(log.durations(), reference(path).to_numpy())
+
+    # A new reader resumes from the cache and only parses what was appended since.
+    write(path, episode_lines(51, 5), "a")
+    resumed = MatchLog(path)
+    assert resumed._offset == os.path.getsize(path)
+    assert len(resumed) == 55
+    np.testing.assert_allclose(resumed.durations(), reference(path).to_numpy())
+    np.testing.assert_array_equal(resumed["episode"], np.arange(1, 56))
+
+
+def test_changed_prefix_invalidates_the_cache(tmp_path):
+    path = str(tmp_path / "agent.kwy")
+    write(path, HEADER + episode_lines(1, 30))
+    assert len(MatchLog(path)) == 30
+    assert os.path.exists(path + ".npz")
+
+    # The log is replaced by another one, at least as long, with different episodes.
+    write(path, HEADER.replace("3", "4") + episode_lines(1, 40, seed=1))
+    log = MatchLog(path)
+    assert len(log) == 40
+    np.testing.assert_allclose(log.durations(), reference(path).to_numpy())
+
+
+def test_summary(tmp_path):
+    for field_size, count in (("20x20", 10), ("30x30", 20)):
+        os.mkdir(tmp_path / field_size)
+        write(str(tmp_path / field_size / "agent.kwy"), HEADER + episode_lines(1, count))
+    table = summary(str(tmp_path), last=5)
+    assert table["field_size"].tolist() == ["20x20", "30x30"]
+    assert table["episodes"].tolist() == [5, 5]
+    np.testing.assert_allclose(table[["o", "t", "w"]].sum(axis=1), 1.)
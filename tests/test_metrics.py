@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from metrics import EWMA, DownsampledHistory, RunningStats, TrainingMetrics, WindowStats
+
+
+def values(n=200, seed=0):
+    return np.random.default_rng(seed).normal(3., 2., size=n)
+
+
+def test_running_stats_match_numpy():
+    data = values()
+    stats = RunningStats()
+    for t, value in enumerate(data, 1):
+        stats.update(value)
+        np.testing.assert_allclose([stats.mean, stats.var], [data[:t].mean(), data[:t].var()], atol=1e-12)
+    assert (stats.count, stats.min, stats.max) == (len(data), data.min(), data.max())
+    np.testing.assert_allclose(stats.se, data.std() / np.sqrt(len(data)))
+
+
+@pytest.mark.parametrize("size", [1, 7, 64])
+def test_window_stats_match_numpy(size):
+    data = values()
+    window = WindowStats(size)
+    for t, value in enumerate(data, 1):
+        window.update(value)
+        last = data[max(0, t - size):t]
+        np.testing.assert_array_equal(window.values(), last)
+        np.testing.assert_allclose([window.mean, window.var], [last.mean(), last.var()], atol=1e-9)
+
+
+def test_ewma_matches_the_weighted_mean():
+    data = values()
+    alpha = 0.1
+    ewma = EWMA(alpha)
+    for t, value in enumerate(data, 1):
+        ewma.update(value)
+        weights = (1 - alpha) ** np.arange(t)[::-1]
+        np.testing.assert_allclose(ewma.value, np.average(data[:t], weights=weights))
+
+
+@pytest.mark.parametrize("capacity", [2, 4, 5])
+def test_downsampled_history_means_after_merges(capacity):
+    data = values(1000)
+    history = DownsampledHistory(capacity)
+    for t, value in enumerate(data, 1):
+        history.update(value)
+        episodes, means = history.history()
+        block = history.block
+        assert len(means) <= history.capacity == capacity - capacity % 2
+        np.testing.assert_array_equal(episodes, block * np.arange(1, len(means) + 1))
+        np.testing.assert_allclose(means, data[:len(means) * block].reshape(-1, block).mean(axis=1))
+        # Only the incomplete last block is missing from the history.
+        assert t - len(means) * block < block
+    assert history.total == len(data) and history.block > 1
+
+
+@pytest.mark.parametrize("capacity", [-1, 0, 1])
+def test_downsampled_history_needs_two_blocks(capacity):
+    with pytest.raises(ValueError):
+        DownsampledHistory(capacity)
+
+
+def test_training_metrics_summary():
+    data = values(50)
+    metrics = TrainingMetrics(windows=(10, 100), ewma_alpha=0.5, history=8)
+    metrics.update(data[:20])
+    for value in data[20:]:
+        metrics.update(value)
+    assert metrics.episodes == 50
+    summary = metrics.summary()
+    np.testing.assert_allclose(summary['avg_10'], data[-10:].mean())
+    np.testing.assert_allclose(summary['avg_100'], data.mean())
+    np.testing.assert_allclose(metrics.running.mean, data.mean())
@@ -0,0 +1,86 @@
+import random
+
+import numpy as np
+import pytest
+import torch
+
+from agents.orla import ORLA, ORLABaseline
+from argumentation import utils as argm
+from utils import Mode
+
+from test_decode_state import prefix
+
+ARGS = ["a{}".format(i) for i in range(6)]
+
+
+def reference_learn(agent: ORLABaseline, rankings, probs, returns):
+    """The update of the baseline and the policy with one loop per episode and step, with the state before
+    each step rebuilt by `ranking_to_matrix` (for strict rankings, the prefix of the first t levels)."""
+    deltas = []
+    step_w = np.zeros_like(agent.w)
+    for ranking, final_return in zip(rankings, returns):
+        delta = []
+        for t in range(agent.n):
+            state_t = argm.ranking_to_matrix(prefix(ranking, t), agent.args, True)
+            delta_t = final_return - agent.state_value(state_t)
+            step_w[state_t] += agent.alpha_w * delta_t
+            delta.append(delta_t)
+        deltas.append(delta)
+    agent.w += step_w
+    ORLA.learn(agent, probs, torch.FloatTensor(deltas))
+
+
+@pytest.mark.parametrize("mode", [Mode.STRICT, Mode.NON_STRICT])
+def test_vectorised_learn_matches_the_loop(mode):
+    agents = []
+    for _ in range(2):
+        torch.manual_seed(0)
+        agents.append(ORLABaseline(ARGS, 1e-2, 1e-2, torch.device("cpu"), mode))
+    vectorised, looped = agents
+    rng = random.Random(0)
+    for _ in range(5):
+        returns = [rng.random() for _ in range(4)]
+        torch.manual_seed(1)
+        rankings, probs, state = vectorised.decode_rankings(4, return_state=True)
+        vectorised.learn(rankings, probs, returns, state)
+        torch.manual_seed(1)
+        looped_rankings, looped_probs = looped.decode_rankings(4)
+        assert looped_rankings == rankings
+        reference_learn(looped, rankings, looped_probs, returns)
+
+        np.testing.assert_allclose(vectorised.w, looped.w)
+        for p, q in zip(vectorised.net.parameters(), looped.net.parameters()):
+            torch.testing.assert_close(p, q)
+
+
+def test_learn_rebuilds_the_state_from_the_rankings():
+    torch.manual_seed(0)
+    agent = ORLABaseline(ARGS, 1e-2, 1e-2, torch.device("cpu"), Mode.NON_STRICT)
+    rankings, probs, state = agent.decode_rankings(4, return_state=True)
+    w = agent.w.copy()
+    agent.learn(rankings, probs, [1., 0., 1., 0.], state)
+    with_state = agent.w - w
+    agent.w = w.copy()
+    agent.learn(rankings, agent.decode_rankings(4)[1], [1., 0., 1., 0.])
+    np.testing.assert_allclose(agent.w - w, with_state)
+
+
+def test_greedy_ranking_is_cached_until_the_policy_changes():
+    torch.manual_seed(0)
+    agent = ORLABaseline(ARGS, 1e-1, 1e-2, torch.device("cpu"), Mode.STRICT)
+    ranking, probs = agent.decode_ranking(True)
+    assert agent.decode_ranking(True)[1] is probs
+    rankings, uncached = agent.decode_rankings(1, greedy=True)
+    assert rankings[0] == ranking
+    torch.testing.assert_close(uncached[0], probs)
+
+    rankings, batch_probs, state = agent.decode_rankings(4, return_state=True)
+    agent.learn(rankings, batch_probs, [1., 0., 1., 0.], state)
+    assert agent.decode_ranking(True)[1] is not probs
+
+    # Loading a policy with the same number of updates invalidates the cache too.
+    torch.manual_seed(1)
+    other = ORLABaseline(ARGS, 1e-1, 1e-2, torch.device("cpu"), Mode.STRICT)
+    other.learn(rankings, other.evaluate_rankings(rankings), [0., 1., 0., 1.])
+    agent.load_state_dict(other.state_dict())
+    torch.testing.assert_close(agent.decode_ranking(True)[1], other.decode_ranking(True)[1])
@@ -0,0 +1,39 @@
+import itertools
+
+import torch
+
+from agents.plackett_luce import PlackettLuce
+
+ARGS = ["a{}".format(i) for i in range(4)]
+
+
+def make_agent():
+    torch.manual_seed(0)
+    return PlackettLuce(ARGS, 1e-1, 1e-2, torch.device("cpu"))
+
+
+def test_probabilities_sum_to_one_over_all_rankings():
+    agent = make_agent()
+    with torch.no_grad():
+        agent.net.scores.copy_(torch.tensor([1.5, -0.5, 0.3, 2.]))
+    rankings = [[[arg] for arg in permutation] for permutation in itertools.permutations(ARGS)]
+    probs = agent.evaluate_rankings(rankings)
+    assert torch.isclose(probs.prod(dim=1).sum(), torch.tensor(1.))
+    assert torch.allclose(agent.evaluate_rankings(rankings, log_probs=True).exp(), probs)
+
+
+def test_learning_from_improbable_rankings_keeps_finite_scores():
+    agent = make_agent()
+    with torch.no_grad():
+        agent.net.scores.copy_(torch.tensor([0., -200., -400., -600.]))
+    # The reversed ranking has a probability that underflows to 0.
+    rankings = [[[arg] for arg in reversed(ARGS)]]
+    assert agent.evaluate_rankings(rankings)[0, 0] == 0
+    log_probs = agent.evaluate_rankings(rankings, log_probs=True)
+    assert torch.isfinite(log_probs).all()
+    agent.learn(rankings, log_probs, [1.], log_probs=True)
+    assert torch.isfinite(agent.net.scores).all()
+
+    # Probabilities are clamped before taking their log.
+    agent.learn(rankings, agent.evaluate_rankings(rankings), [1.])
+    assert torch.isfinite(agent.net.scores).all()
@@ -0,0 +1,92 @@
+import math
+import random
+
+import numpy as np
+import pytest
+import torch
+
+from agents.decode_state import DecodeState
+from agents.orla import ORLA, ORLABaseline
+from utils import Mode
+
+from test_decode_state import random_ranking
+
+ARGS = ["a{}".format(i) for i in range(7)]
+
+
+def make_agent(mode):
+    torch.manual_seed(0)
+    return ORLABaseline(ARGS, 1e-2, 1e-2, torch.device("cpu"), mode, architecture='pointer', net_kwargs={'dim': 16})
+
+
+def partial_states(mode, batch_size=16, seed=0):
+    """Decode states of a batch of random rankings, stopped after each number of steps."""
+    rng = random.Random(seed)
+    rankings = [random_ranking(mode, rng, ARGS) for _ in range(batch_size)]
+    states = []
+    for t in range(len(ARGS)):
+        state = DecodeState(ARGS, batch_size, mode)
+        for step, (indices, new_level) in enumerate(state.replay(rankings)):
+            if step == t:
+                break
+            state.append(indices, new_level)
+        states.append(state)
+    return states
+
+
+@pytest.mark.parametrize("mode", [Mode.STRICT, Mode.NON_STRICT])
+def test_parameters_grow_linearly(mode):
+    counts = [sum(p.numel() for p in ORLA.PointerNet(n, mode, dim=16).parameters()) for n in (8, 16, 32, 64)]
+    increments = np.diff(counts)
+    assert increments[1] == 2 * increments[0] and increments[2] == 2 * increments[1]
+    # n^4 weights of the MLP against a few per argument.
+    assert counts[-1] < 64 * 64 * 16
+
+
+@pytest.mark.parametrize("mode", [Mode.STRICT, Mode.NON_STRICT])
+@pytest.mark.parametrize("grad", [True, False])
+def test_outputs_are_masked_and_normalised(mode, grad):
+    agent = make_agent(mode)
+    for state in partial_states(mode):
+        masks = state.masks()
+        with torch.set_grad_enabled(grad):
+            probs = agent.get_action_probs(state.matrix, masks)
+        assert probs.shape == (16, len(ARGS) * (1 if mode == Mode.STRICT else 2))
+        torch.testing.assert_close(probs.sum(dim=-1), torch.ones(16))
+        assert torch.all(probs[torch.from_numpy(~masks)] == 0)
+        assert torch.all(probs[torch.from_numpy(masks)] > 0)
+
+
+def test_non_strict_outputs_are_interleaved():
+    agent = make_agent(Mode.NON_STRICT)
+    # Every argument scores log(3) more for joining the last level than for starting a new one.
+    with torch.no_grad():
+        agent.net.fc_out.weight.zero_()
+        agent.net.fc_out.bias.copy_(torch.tensor([0., math.log(3.)]))
+    for state in partial_states(Mode.NON_STRICT):
+        probs = agent.get_action_probs(state.matrix, state.masks()).detach().view(16, len(ARGS), 2)
+        remaining = torch.from_numpy(state.masks()).view(16, len(ARGS), 2).any(dim=-1)
+        torch.testing.assert_close(probs[..., 1][remaining], 3 * probs[..., 0][remaining])
+
+
+@pytest.mark.parametrize("mode", [Mode.STRICT, Mode.NON_STRICT])
+def test_decoding_matches_the_replay(mode):
+    agent = make_agent(mode)
+    torch.manual_seed(1)
+    rankings, probs = agent.decode_rankings(8)
+    replayed = agent.evaluate_rankings(rankings)
+    # Both outputs of the first argument start the ranking, so only the later steps are comparable.
+    torch.testing.assert_close(probs[:, 1:], replayed[:, 1:])
+    assert torch.all(replayed[:, 0] >= probs[:, 0] - 1e-6)
+
+
+@pytest.mark.parametrize("mode", [Mode.STRICT, Mode.NON_STRICT])
+def test_learn_one_step(mode):
+    agent = make_agent(mode)
+    before = [p.detach().clone() for p in agent.net.parameters()]
+    rankings, probs, state = agent.decode_rankings(4, return_state=True)
+    agent.learn(rankings, probs, [1., 0., 0.5, 0.], state)
+    after = list(agent.net.parameters())
+    assert agent.updates == 1 and agent.episodes == 4
+    assert all(torch.isfinite(p).all() for p in after)
+    assert any(not torch.equal(p, q) for p, q in zip(before, after))
@@ -0,0 +1,28 @@
+import torch
+
+import profiling
+from agents.plackett_luce import PlackettLuce
+from environments.foggy_frozen_lake.FFL import FFL
+from environments.foggy_frozen_lake.utils import argument_actions
+
+
+def test_overrides_and_counters_are_profiled():
+    profiler = profiling.Profiler()
+    original = vars(PlackettLuce)['decode_rankings']
+    profiler.enable()
+    try:
+        agent = PlackettLuce(list(argument_actions), 1e-2, 1e-2, torch.device("cpu"))
+        env = FFL(argument_actions, 8, 0.8)
+        env.enable_return_cache()
+        rankings, probs, state = agent.decode_rankings(4, return_state=True)
+        returns = [env.play(ranking) for ranking in rankings + rankings]
+        agent.learn(rankings, probs, returns[:4], state)
+    finally:
+        profiler.disable()
+    assert vars(PlackettLuce)['decode_rankings'] is original
+
+    stats = profiler.to_dict()
+    assert stats['timers']['decode_rankings']['count'] == 1
+    assert stats['timers']['play']['count'] == 8
+    assert stats['counters']['episodes_learnt'] == 4
+    assert stats['counters']['return_cache_hits'] + stats['counters']['return_cache_misses'] == 8
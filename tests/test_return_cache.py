@@ -0,0 +1,109 @@
+import random
+
+import numpy as np
+import pytest
+
+from environments.foggy_frozen_lake.FFL import FFL
+from environments.foggy_frozen_lake.utils import argument_actions
+from environments.return_cache import ReturnCache
+
+# (bitmask of the valid arguments, action) at every step.
+TRAJECTORY = [(0b011, 1), (0b110, 2), (0b101, 0)]
+
+
+def follow(trajectory, diverge_at=None):
+    """Policy that takes the actions of the trajectory, except at depth `diverge_at`."""
+    actions = {mask: action for mask, action in trajectory}
+    depth = {mask: t for t, (mask, _) in enumerate(trajectory)}
+    return lambda mask: actions[mask] + (1 if depth[mask] == diverge_at else 0)
+
+
+def n_nodes(node):
+    return 1 + sum(n_nodes(child) for child in node.children.values())
+
+
+def assert_consistent(cache):
+    sizes = [(n_nodes(root), size) for root, size in cache._roots.values()]
+    assert all(counted == size for counted, size in sizes)
+    assert len(cache) == sum(size for _, size in sizes) <= cache.max_nodes
+
+
+@pytest.mark.parametrize("k", range(len(TRAJECTORY)))
+def test_divergence_at_depth_k_is_a_miss(k):
+    cache = ReturnCache()
+    cache.insert("map", TRAJECTORY, 1.)
+    assert cache.lookup("map", follow(TRAJECTORY, diverge_at=k)) is None
+    assert cache.lookup("map", follow(TRAJECTORY)) == 1.
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_random_action_is_a_miss():
+    cache = ReturnCache()
+    cache.insert("map", TRAJECTORY, 1.)
+    assert cache.lookup("map", lambda mask: None) is None
+
+
+def test_keys_do_not_share_entries():
+    cache = ReturnCache()
+    cache.insert("a", TRAJECTORY, 1.)
+    assert cache.lookup("b", follow(TRAJECTORY)) is None
+    cache.insert("b", TRAJECTORY, 2.)
+    assert cache.lookup("a", follow(TRAJECTORY)) == 1.
+    assert cache.lookup("b", follow(TRAJECTORY)) == 2.
+    assert len(cache) == 2 * (len(TRAJECTORY) + 1)
+
+
+def test_branches_share_their_prefix():
+    cache = ReturnCache()
+    cache.insert("map", TRAJECTORY, 1.)
+    branch = TRAJECTORY[:1] + [(0b110, 0), (0b111, 1)]
+    cache.insert("map", branch, 3.)
+    # Only the two nodes after the common first step are new.
+    assert len(cache) == len(TRAJECTORY) + 1 + 2
+    assert cache.lookup("map", follow(branch)) == 3.
+    assert cache.lookup("map", follow(TRAJECTORY)) == 1.
+    assert_consistent(cache)
+
+
+def test_lru_eviction_by_node_count():
+    size = len(TRAJECTORY) + 1
+    cache = ReturnCache(max_nodes=2 * size)
+    cache.insert("a", TRAJECTORY, 1.)
+    cache.insert("b", TRAJECTORY, 2.)
+    # Looking "a" up makes "b" the least recently used.
+    assert cache.lookup("a", follow(TRAJECTORY)) == 1.
+    cache.insert("c", TRAJECTORY, 3.)
+    assert_consistent(cache)
+    assert list(cache._roots) == ["a", "c"]
+    assert cache.lookup("b", follow(TRAJECTORY)) is None
+
+    # Growing the trie of "a" past the limit evicts "c", not the trie being grown.
+    cache.insert("a", TRAJECTORY[:1] + [(0b110, 0)], 4.)
+    assert_consistent(cache)
+    assert list(cache._roots) == ["a"]
+    assert cache.lookup("a", follow(TRAJECTORY)) == 1.
+
+    cache.clear()
+    assert len(cache) == 0 and cache.lookup("a", follow(TRAJECTORY)) is None
+
+
+def test_play_gives_the_same_returns_with_and_without_cache():
+    rng = random.Random(0)
+    args = list(argument_actions)
+    rankings = [[[arg] for arg in rng.sample(args, len(args))] for _ in range(20)]
+    rankings += rankings
+
+    returns = []
+    for cached in (False, True):
+        np.random.seed(0)
+        env = FFL(argument_actions, 8, 0.8, rng=np.random.default_rng(0))
+        if cached:
+            env.enable_return_cache()
+        played = []
+        for i, ranking in enumerate(rankings):
+            # Episodes with random actions are never cached, and replay the same actions.
+            random.seed(i)
+            played.append(env.play(ranking))
+        returns.append(played)
+    assert returns[0] == returns[1]
+    assert env._return_cache.hits > 0
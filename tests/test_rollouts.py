@@ -0,0 +1,36 @@
+import functools
+import random
+
+
+from environments.foggy_frozen_lake.FFL import FFL
+from environments.foggy_frozen_lake.utils import argument_actions
+from environments.rollouts import RolloutExecutor
+
+
+def random_rankings(k: int, seed: int = 0):
+    rng = random.Random(seed)
+    args = list(argument_actions)
+    return [[[arg] for arg in rng.sample(args, len(args))] for _ in range(k)]
+
+
+def test_fresh_maps_are_reproducible():
+    env = FFL(argument_actions, 8, 0.8, fresh_maps=True)
+    keys = []
+    for _ in range(2):
+        env.seed(3)
+        env.reset()
+        first = env.episode_key()
+        env.reset()
+        keys.append((first, env.episode_key()))
+    assert keys[0] == keys[1]
+    assert keys[0][0] != keys[0][1]
+
+
+def test_results_do_not_depend_on_the_workers():
+    factory = functools.partial(FFL, argument_actions, 8, 0.8, fresh_maps=True)
+    rankings = random_rankings(32)
+    results = []
+    for n_workers in (1, 3):
+        with RolloutExecutor(factory, n_workers=n_workers, seed=5) as executor:
+            results.append(executor.evaluate(rankings) + executor.evaluate(rankings))
+    assert results[0] == results[1]
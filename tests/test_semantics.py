@@ -0,0 +1,122 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from argumentation.semantics import BitsetAF, grounded_extension, pack, unpack
+
+
+def random_af(rng, n, p):
+    """Random attack matrix, self-attacks included."""
+    return rng.random((n, n)) < p
+
+
+def naive_grounded(mat):
+    """Least fixpoint of the characteristic function F(S) = {a | every attacker of a is attacked by S}."""
+    ext = np.zeros(len(mat), dtype=bool)
+    while True:
+        defeated = mat[ext].any(axis=0)
+        defended = ~(mat & ~defeated[:, None]).any(axis=0)
+        if np.array_equal(defended, ext):
+            return ext
+        ext = defended
+
+
+def naive_conflict_free(mat, ext):
+    return not mat[np.ix_(ext, ext)].any()
+
+
+def naive_admissible(mat, ext):
+    defeated = mat[ext].any(axis=0)
+    return naive_conflict_free(mat, ext) and all(defeated[mat[:, a]].all() for a in np.flatnonzero(ext))
+
+
+def naive_complete(mat, ext):
+    defeated = mat[ext].any(axis=0)
+    defended = np.array([defeated[mat[:, a]].all() for a in range(len(mat))], dtype=bool)
+    return naive_admissible(mat, ext) and not (defended & ~ext).any()
+
+
+def naive_stable(mat, ext):
+    return naive_conflict_free(mat, ext) and mat[ext].any(axis=0)[~ext].all()
+
+
+def candidates(rng, mat, k=30):
+    """Extensions to test: every subset of small AFs, else the grounded extension, its neighbours and random sets."""
+    n = len(mat)
+    if n <= 8:
+        return [np.array(bits, dtype=bool) for bits in itertools.product([False, True], repeat=n)]
+    grounded = naive_grounded(mat)
+    exts = [grounded]
+    for a in rng.choice(n, size=min(n, k), replace=False):
+        ext = grounded.copy()
+        ext[a] = ~ext[a]
+        exts.append(ext)
+    exts += [rng.random(n) < q for q in np.linspace(0.05, 0.5, k)]
+    return exts
+
+
+def edges(mat):
+    attackers, attacked = np.nonzero(mat)
+    return attackers, attacked
+
+
+@pytest.mark.parametrize("n", [0, 1, 5, 8, 63, 64, 65, 130])
+def test_bitsets_match_the_naive_semantics(n):
+    rng = np.random.default_rng(n)
+    for trial in range(6):
+        mat = random_af(rng, n, p=min(1., 1.5 / max(n, 1)) if trial % 2 else 0.3)
+        if trial == 0 and n > 0:
+            mat[np.arange(n), np.arange(n)] = True
+        for af in (BitsetAF(mat), BitsetAF.from_edges(n, *edges(mat))):
+            assert np.array_equal(af.attacks, pack(mat))
+            assert np.array_equal(af.attackers, pack(mat.T))
+            assert np.array_equal(af.grounded(), naive_grounded(mat))
+            for ext in candidates(rng, mat):
+                assert af.is_conflict_free(ext) == naive_conflict_free(mat, ext)
+                assert af.is_admissible(ext) == naive_admissible(mat, ext)
+                assert af.is_complete(ext) == naive_complete(mat, ext)
+                assert af.is_stable(ext) == naive_stable(mat, ext)
+
+
+def test_constructed_stable_extension_over_several_words():
+    rng = np.random.default_rng(1)
+    n = 150
+    mat = random_af(rng, n, 0.02)
+    ext = rng.random(n) < 0.3
+    # No attacks inside the extension, and every argument outside of it is attacked from inside.
+    mat[np.ix_(ext, ext)] = False
+    inside = np.flatnonzero(ext)
+    mat[rng.choice(inside, size=n - len(inside)), np.flatnonzero(~ext)] = True
+    for af in (BitsetAF(mat), BitsetAF.from_edges(n, *edges(mat))):
+        assert af.is_stable(ext) and naive_stable(mat, ext)
+        assert af.is_complete(ext) == naive_complete(mat, ext)
+        missing = ext.copy()
+        missing[inside[-1]] = False
+        assert af.is_stable(missing) == naive_stable(mat, missing)
+
+
+def test_self_attacks_are_never_accepted():
+    # a0 attacks itself and a1; a2 is unattacked and attacks a0.
+    mat = np.zeros((3, 3), dtype=bool)
+    mat[0, 0] = mat[0, 1] = mat[2, 0] = True
+    af = BitsetAF(mat)
+    assert af.grounded().tolist() == [False, True, True]
+    assert not af.is_conflict_free(np.array([True, False, False]))
+    assert grounded_extension(["a0", "a1", "a2"], mat) == ["a1", "a2"]
+
+
+def test_empty_af():
+    af = BitsetAF(np.zeros((0, 0), dtype=bool))
+    empty = np.zeros(0, dtype=bool)
+    assert af.grounded().shape == (0,)
+    assert af.is_complete(empty) and af.is_stable(empty)
+    assert BitsetAF.from_edges(0, [], []).grounded().shape == (0,)
+
+
+def test_pack_round_trip():
+    rng = np.random.default_rng(0)
+    for n in (1, 64, 65, 200):
+        mask = rng.random((3, n)) < 0.5
+        assert pack(mask).shape == (3, -(-n // 64))
+        assert np.array_equal(unpack(pack(mask), n), mask)
@@ -0,0 +1,121 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from environments.takeaway.client import AsyncTakeaway, SimulatorEndpoint, decode_ranking, encode_ranking, start_message
+from environments.takeaway.standin import StandinSimulator, parse_start
+
+ARGS = ["a{}".format(i) for i in range(5)]
+INDEX = {arg: i for i, arg in enumerate(ARGS)}
+STRICT = [[arg] for arg in reversed(ARGS)]
+NON_STRICT = [["a3", "a1"], ["a0"], ["a4", "a2"]]
+
+
+def free_endpoints(n: int):
+    """Endpoints on local UDP ports that are free right now."""
+    sockets = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(2*n)]
+    for s in sockets:
+        s.bind(("127.0.0.1", 0))
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return [SimulatorEndpoint("127.0.0.1", ports[2*i], "127.0.0.1", ports[2*i + 1]) for i in range(n)]
+
+
+class ScriptedSimulator(StandinSimulator):
+    """Stand-in that records the raw start messages, and takes the delay of each episode from a list."""
+    def __init__(self, endpoint, delays=(), **kwargs):
+        super().__init__(endpoint, **kwargs)
+        self.messages = []
+        self.delays = list(delays)
+
+    def datagram_received(self, data, addr):
+        self.messages.append(data)
+        if self.delays:
+            self.delay = self.delays.pop(0)
+        super().datagram_received(data, addr)
+
+
+def run(client_kwargs, simulators_kwargs, play):
+    """Plays `play(client)` against one stand-in per element of `simulators_kwargs`, and returns its result
+    and the simulators."""
+    async def main():
+        endpoints = free_endpoints(len(simulators_kwargs))
+        simulators = [ScriptedSimulator(endpoint, **kwargs) for endpoint, kwargs in zip(endpoints, simulators_kwargs)]
+        for simulator in simulators:
+            await simulator.open()
+        try:
+            async with AsyncTakeaway(ARGS, endpoints, **client_kwargs) as client:
+                return await play(client), simulators
+        finally:
+            for simulator in simulators:
+                simulator.close()
+    return asyncio.run(main())
+
+
+def test_episodes_run_in_parallel():
+    start = time.perf_counter()
+    rewards, simulators = run(
+        {"tagged": True}, [{"delay": 0.2, "seed": i} for i in range(4)],
+        lambda client: client.evaluate([STRICT] * 8))
+    # 8 episodes of 0.2 s on 4 simulators take two rounds.
+    assert time.perf_counter() - start < 1.
+    replies = sorted(-duration for simulator in simulators for _, duration in simulator.replies)
+    assert sorted(rewards) == replies
+    assert all(len(simulator.replies) == 2 for simulator in simulators)
+
+
+def test_dropped_reply_restarts_the_episode_with_a_new_id():
+    class DropFirst(ScriptedSimulator):
+        def datagram_received(self, data, addr):
+            if not self.messages:
+                self.messages.append(data)
+                return
+            super().datagram_received(data, addr)
+
+    async def main():
+        endpoint, = free_endpoints(1)
+        simulator = DropFirst(endpoint, seed=0)
+        await simulator.open()
+        try:
+            async with AsyncTakeaway(ARGS, [endpoint], timeout=0.1, tagged=True) as client:
+                return await client.play(STRICT), simulator
+        finally:
+            simulator.close()
+    reward, simulator = asyncio.run(main())
+    ids = [parse_start(message)[0] for message in simulator.messages]
+    assert len(ids) == 2 and ids[0] != ids[1]
+    assert simulator.replies == [(ids[1], -reward)]
+
+
+def test_late_reply_with_a_stale_id_is_ignored():
+    durations = iter([10., 20.])
+    # The first episode replies after the timeout, while its restart is still being played.
+    reward, (simulator,) = run(
+        {"timeout": 0.3, "tagged": True, "max_retries": 1},
+        [{"delays": [0.4, 0.2], "duration": lambda: next(durations)}],
+        lambda client: client.play(STRICT))
+    ids = [parse_start(message)[0] for message in simulator.messages]
+    assert simulator.replies == [(ids[0], 10.), (ids[1], 20.)]
+    assert reward == -20.
+
+
+@pytest.mark.parametrize("ranking", [STRICT, NON_STRICT])
+def test_in_band_ranking_round_trip(ranking):
+    payload = encode_ranking(INDEX, ranking)
+    assert payload[:2] == b"RK"
+    expected = [[INDEX[arg] for arg in level] for level in ranking]
+    assert decode_ranking(payload) == expected
+
+    _, (simulator,) = run({"in_band": True, "tagged": True}, [{}], lambda client: client.play(ranking))
+    assert simulator.rankings == [expected]
+
+
+def test_untagged_start_messages_by_default():
+    assert start_message() == b"start"
+    reward, (simulator,) = run({}, [{"legacy": True}], lambda client: client.play(STRICT))
+    # Players that expect exactly "start" keep working, and their untagged replies are accepted.
+    assert simulator.messages == [b"start"]
+    assert simulator.replies == [(None, -reward)]
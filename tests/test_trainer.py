@@ -0,0 +1,82 @@
+import time
+
+import pytest
+import torch
+
+from agents.checkpoint import Checkpointer, load
+from agents.orla import ORLABaseline
+from metrics import TrainingMetrics
+from trainer import Batch, Trainer
+from utils import Mode
+
+ARGS = ["a{}".format(i) for i in range(6)]
+
+
+def make_agent():
+    torch.manual_seed(0)
+    return ORLABaseline(ARGS, 1e-2, 1e-2, torch.device("cpu"), Mode.STRICT)
+
+
+def rollout(rankings):
+    """Deterministic returns: the earlier a0 is ranked, the higher."""
+    return [-float(next(t for t, level in enumerate(ranking) if "a0" in level)) for ranking in rankings]
+
+
+def test_sequential_run_matches_the_plain_loop():
+    agent = make_agent()
+    torch.manual_seed(1)
+    Trainer(agent, None, batch_size=4, max_staleness=0, rollout=rollout).train(20)
+
+    expected = make_agent()
+    torch.manual_seed(1)
+    for _ in range(5):
+        rankings, probs, state = expected.decode_rankings(4, return_state=True)
+        expected.learn(rankings, probs, rollout(rankings), state)
+
+    assert agent.updates == expected.updates == 5
+    for p, q in zip(agent.net.parameters(), expected.net.parameters()):
+        torch.testing.assert_close(p, q)
+    torch.testing.assert_close(agent.w, expected.w)
+
+
+@pytest.mark.parametrize("max_staleness", [1, 2])
+def test_staleness_is_bounded(max_staleness):
+    def slow(rankings):
+        time.sleep(0.01)
+        return rollout(rankings)
+    trainer = Trainer(make_agent(), None, batch_size=4, max_staleness=max_staleness, rollout=slow)
+    trainer.train(40)
+    assert len(trainer.staleness) == 10
+    assert max(trainer.staleness) <= max_staleness
+    # All but the first batch are decoded ahead of the previous update.
+    assert trainer.staleness[0] == 0 and min(trainer.staleness[1:]) >= 1
+
+
+def test_importance_weights():
+    agent = make_agent()
+    trainer = Trainer(agent, None, batch_size=4, max_staleness=1, max_ratio=2., rollout=rollout)
+    batch = trainer.decode()
+    log_probs = agent.evaluate_rankings(batch.rankings, log_probs=True)
+    # Not stale: on-policy.
+    assert trainer.importance_weights(batch, log_probs) is None
+
+    stale = Batch(batch.rankings, batch.state, agent.updates - 1, batch.behaviour_log_probs)
+    torch.testing.assert_close(trainer.importance_weights(stale, log_probs), torch.ones(4))
+    shifted = log_probs + torch.tensor([-1., 0., 1., 2.])[:, None] / len(ARGS)
+    weights = trainer.importance_weights(stale, shifted)
+    torch.testing.assert_close(weights, torch.exp(torch.tensor([-1., 0., 1., 2.])).clamp_max(2.))
+
+
+def test_checkpoint_hook_fires(tmp_path):
+    path = str(tmp_path / "orla.pt")
+    agent = make_agent()
+    metrics = TrainingMetrics()
+    saves = []
+    with Checkpointer(agent, path, every=8) as checkpointer:
+        save = checkpointer.save
+        checkpointer.save = lambda **kwargs: (saves.append(agent.episodes), save(**kwargs))[1]
+        Trainer(agent, None, batch_size=4, rollout=rollout, metrics=metrics, checkpointer=checkpointer).train(32)
+    assert saves == [8, 16, 24, 32]
+    state = load(path)
+    assert state["episodes"] == 32
+    assert "metrics" in state["extra"]
@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+import pytest
+from gymnasium.envs.toy_text.frozen_lake import generate_random_map
+
+from environments.foggy_frozen_lake.FFL import FFL
+from environments.foggy_frozen_lake.utils import argument_actions
+from environments.foggy_frozen_lake.vectorized import VectorFFL
+from utils import Mode
+
+from test_decode_state import random_ranking
+
+
+class FallbackFFL(FFL):
+    """FFL that records whether an episode took a random action (because no argument was acceptable)."""
+    def play(self, ranking):
+        self.random_action = False
+        return super().play(ranking)
+
+    def get_extension_action(self, ext):
+        self.random_action |= len(ext) == 0
+        return super().get_extension_action(ext)
+
+
+@pytest.mark.parametrize("n", [4, 8, 12])
+@pytest.mark.parametrize("mode", [Mode.STRICT, Mode.NON_STRICT])
+def test_vector_ffl_matches_ffl(n, mode):
+    rng = random.Random(n)
+    maps = [generate_random_map(n, 0.8, seed=n*1000 + i) for i in range(80)]
+    rankings = [random_ranking(mode, rng, list(argument_actions)) for _ in maps]
+
+    returns = VectorFFL(argument_actions, seed=0).play(rankings, maps)
+    env = FallbackFFL(argument_actions, n)
+    compared = 0
+    for desc, ranking, total_reward in zip(maps, rankings, returns):
+        env.reset(desc=desc)
+        expected = env.play(ranking)
+        if not env.random_action:
+            assert total_reward == expected
+            compared += 1
+    # Ties in non-strict rankings often leave no acceptable argument, so fewer of their episodes are compared.
+    assert compared >= len(maps) // 4